@@ -0,0 +1,87 @@
+"""Time loading the JSON ledger at several sizes, old path against new.
+
+Writes a synthetic ledger.json of N records into a temporary data directory
+and times, best of --repeat runs:
+
+    per-record   json.load, then Expense.model_validate once per record
+                 (how load_all worked before)
+    load_all     LocalJsonStorage.load_all: one validate_json over the file
+    view         LocalJsonStorage.view: json.load and ExpenseView wrappers,
+                 summing amount_gross as a report would
+
+    python scripts/bench_load.py [--sizes 10000,100000,1000000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+_VENDORS = ["Hetzner", "Google", "Swisscom", "SBB", "Migros", "Digitec", "Anthropic"]
+
+
+def _record(i: int, rng: random.Random) -> dict:
+    day = date(2024, 1, 1) + timedelta(days=rng.randrange(900))
+    gross = f"{rng.randrange(100, 100000) / 100:.2f}"
+    return {
+        "id": f"{i:012x}", "file_path": f"/archive/{day:%y-%m}/doc{i}.pdf", "file_hash": f"{i:064x}",
+        "vendor": rng.choice(_VENDORS), "vendor_country": "CH", "invoice_number": f"R-{i}",
+        "receipt_number": "", "date": day.isoformat(), "period": "", "description": "Hosting",
+        "amount_gross": gross, "amount_net": gross, "currency": rng.choice(["CHF", "EUR", "USD"]),
+        "vat_rate": "8.1", "vat_amount": "0", "vat_number": "", "category_account": 6570,
+        "category_name": "IT", "labels": rng.sample(["a", "b", "c"], rng.randrange(3)), "notes": "",
+        "context_files": [], "extraction_method": "pdf_text", "page_methods": ["pdf_text"],
+        "extraction_confidence": 0.9, "ai_payload": "", "ai_request_bytes": None, "ai_latency_ms": None,
+        "processed_at": datetime(2026, 1, 1, 12, 0).isoformat(), "status": "processed",
+    }
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma-separated record counts (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, best kept")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="gnomon-bench-") as tmp:
+        os.environ["GNOMON_DATA_DIR"] = tmp  # before the package reads its config
+        from gnomon_expenses.models.expense import Expense
+        from gnomon_expenses.storage.local_json import LocalJsonStorage
+
+        print(f"{'records':>9}  {'per-record':>11}  {'load_all':>9}  {'view':>9}  {'speedup':>8}")
+        for n in (int(s) for s in args.sizes.split(",")):
+            path = Path(tmp) / "ledger.json"
+            rng = random.Random(n)
+            path.write_text(json.dumps([_record(i, rng) for i in range(n)], indent=2))
+            storage = LocalJsonStorage(path=path, journal_mode=False)
+            repeat = args.repeat if n <= 100_000 else 1
+
+            def per_record() -> list[Expense]:
+                with open(path) as f:
+                    return [Expense.model_validate(r) for r in json.load(f)]
+
+            old = _best(per_record, repeat)
+            new = _best(storage.load_all, repeat)
+            view = _best(lambda: sum(e.amount_gross for e in storage.view()), repeat)
+            print(f"{n:>9}  {old:>10.2f}s  {new:>8.2f}s  {view:>8.2f}s  {old / new:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
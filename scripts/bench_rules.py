@@ -0,0 +1,66 @@
+"""Time vendor parsers with and without their declared rule anchors.
+
+For each document, the parser that recognizes it runs as declared and as a
+copy with `anchor`/`lead` removed from its rules (every regex then searched
+from offset 0); both must give the same result. --pad inserts that many
+line-item lines in the middle of the text, where long invoices have them and
+an unanchored rule that opens with a character class is tried at every offset.
+
+    python scripts/bench_rules.py invoice.pdf [receipt.txt ...] [--pad 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import sys
+import timeit
+from pathlib import Path
+
+_FILLER = "Usage line item 0.0001 USD\n"
+
+
+def _text(path: Path) -> str:
+    if path.suffix.lower() == ".pdf":
+        from gnomon_expenses.extraction.pdf_text import extract_text
+
+        return extract_text(path)
+    return path.read_text()
+
+
+def _best_us(fn, number: int = 200) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", type=Path, help="PDFs or extracted text files")
+    parser.add_argument("--pad", type=int, default=300, help="line items inserted mid-document")
+    args = parser.parse_args()
+
+    from gnomon_expenses.extraction.parsers.spec import SpecParser
+    from gnomon_expenses.extraction.pipeline import PARSERS
+
+    print(f"{'document':24} {'parser':18} {'anchored':>9} {'plain':>9}")
+    for path in args.files:
+        text = _text(path)
+        half = len(text) // 2
+        text = text[:half] + "\n" + _FILLER * args.pad + text[half:]
+        vendor = next((p for p in PARSERS if isinstance(p, SpecParser) and p.can_parse(text)), None)
+        if vendor is None or not any(r.anchor for r in vendor.rules):
+            print(f"{path.name:24} {'(no anchored rules)':18}")
+            continue
+        cls = type(vendor)
+        plain = type(f"Plain{cls.__name__}", (cls,), {
+            "rules": tuple(dataclasses.replace(r, anchor="", breaker=None) for r in cls.rules),
+        })()
+        if vars(vendor.parse(text)) != vars(plain.parse(text)):
+            print(f"{path.name}: anchored and plain parses differ", file=sys.stderr)
+            return 1
+        print(f"{path.name:24} {cls.__name__:18} {_best_us(lambda: vendor.parse(text)):7.1f}us "
+              f"{_best_us(lambda: plain.parse(text)):7.1f}us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Check what the CLI imports at startup, and how long that takes.
+
+Runs commands in fresh interpreters under `python -X importtime` and fails
+(exit 1) when a command pulls in a module it should not need, or when
+importing `gnomon_expenses.cli` takes longer than the budget.
+
+    python scripts/import_budget.py [--budget-ms 150]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# Never imported just to start the CLI
+HEAVY = (
+    "rich", "pydantic", "pdfplumber", "pdfminer", "anthropic", "watchdog",
+    "concurrent.futures.process", "gnomon_expenses.extraction", "gnomon_expenses.storage",
+)
+
+# Command line -> modules it must still not import
+COMMANDS: dict[tuple[str, ...], tuple[str, ...]] = {
+    ("--help",): HEAVY,
+    ("categories",): tuple(m for m in HEAVY if m != "rich"),
+    ("note", "nosuchid", "text"): ("rich", "pdfplumber", "pdfminer", "anthropic", "watchdog",
+                                   "gnomon_expenses.extraction"),
+    ("list-expenses",): ("pdfplumber", "pdfminer", "anthropic", "watchdog", "gnomon_expenses.extraction"),
+}
+
+
+def _importtime(code: str, args: tuple[str, ...], env: dict[str, str]) -> dict[str, int]:
+    """Module -> cumulative import time in microseconds."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, *args],
+        capture_output=True, text=True, env=env,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # header line
+    return times
+
+
+def _loaded(times: dict[str, int], module: str) -> bool:
+    return any(name == module or name.startswith(module + ".") for name in times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="most `import gnomon_expenses.cli` may take (best of 5)")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = {**os.environ, "GNOMON_DATA_DIR": data_dir}
+
+        best = min(
+            _importtime("import gnomon_expenses.cli", (), env).get("gnomon_expenses.cli", 0)
+            for _ in range(5)
+        ) / 1000
+        ok = best <= args.budget_ms
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'}  import gnomon_expenses.cli: {best:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+        code = "import sys; from gnomon_expenses.cli import cli; cli(sys.argv[1:])"
+        for argv, banned in COMMANDS.items():
+            times = _importtime(code, argv, env)
+            bad = [m for m in banned if _loaded(times, m)]
+            failed |= bool(bad)
+            status = "FAIL" if bad else "ok  "
+            extra = f" imports {', '.join(bad)}" if bad else ""
+            print(f"{status}  gnomon-expenses {' '.join(argv)}{extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Size-bounded, compressed, content-addressed disk cache under DATA_DIR/cache."""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any
+
+from gnomon_expenses.config import CACHE_DIR
+
+
+class DiskCache:
+    """Key -> bytes store, one zlib-compressed file per key, evicted least-recently-used.
+
+    A hit bumps the entry's mtime, so mtime order is use order. Once the total
+    size passes `max_bytes`, the oldest entries are removed until it is back
+    under 90% of the bound. `max_bytes <= 0` disables the cache.
+    """
+
+    def __init__(self, name: str, max_bytes: int, root: Path | None = None):
+        self.root = (root or CACHE_DIR) / name
+        self.max_bytes = max_bytes
+        self._size: int | None = None  # lazily measured, then tracked
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            value = zlib.decompress(blob)
+        except zlib.error:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        blob = zlib.compress(value, 6)
+        tmp = path.with_name(f".{key}.{os.getpid()}.tmp")
+        tmp.write_bytes(blob)
+        try:
+            replaced = path.stat().st_size  # an overwrite only adds the difference
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, path)
+        if self._size is None:
+            self._size = self._measure()
+        else:
+            self._size += len(blob) - replaced
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def delete(self, key: str) -> bool:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            return False
+        self._size = None
+        return True
+
+    def get_json(self, key: str) -> Any | None:
+        value = self.get(key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+
+    def put_json(self, key: str, obj: Any) -> None:
+        self.put(key, json.dumps(obj, default=str).encode())
+
+    def _entries(self) -> list[tuple[int, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        return entries
+
+    def _measure(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size = total
@@ -1,66 +1,76 @@
-"""Click CLI — all user-facing commands."""
+"""Click CLI — all user-facing commands.
+
+Scripts call this many times a day, so only click is imported up front;
+each command imports what it needs (storage, extraction, rich tables).
+"""
 
 from __future__ import annotations
 
-from datetime import date
-from decimal import Decimal
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
 
 import click
-from rich.console import Console
-from rich.table import Table
 
-from gnomon_expenses.config import SUPPORTED_EXTENSIONS
-from gnomon_expenses.extraction.pipeline import process_pdf
-from gnomon_expenses.models.categories import KMU_ACCOUNTS, list_accounts
-from gnomon_expenses.models.expense import Expense, ExpenseStatus, file_hash
-from gnomon_expenses.storage.local_json import LocalJsonStorage
+if TYPE_CHECKING:
+    import os
+    from datetime import datetime
+
+    from gnomon_expenses.models.expense import Expense
+    from gnomon_expenses.scanner import ScanState
+    from gnomon_expenses.storage.adapter import StorageAdapter
+
+
+class _LazyConsole:
+    """Stands in for rich's Console until the first print, then replaces itself."""
+
+    def __getattr__(self, name: str):
+        from rich.console import Console
 
-console = Console()
+        real = globals()["console"] = Console()
+        return getattr(real, name)
 
 
-def _get_storage() -> LocalJsonStorage:
-    return LocalJsonStorage()
+console = _LazyConsole()
 
 
-def _find_pdfs(directory: Path, recursive: bool = False) -> list[Path]:
-    """Find all PDF files in a directory."""
-    if recursive:
-        return sorted(p for p in directory.rglob("*") if p.suffix.lower() in SUPPORTED_EXTENSIONS)
-    return sorted(p for p in directory.iterdir() if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS)
+def _use_server() -> bool:
+    """Whether to go through a running `serve` daemon (not with --local)."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None and ctx.find_root().params.get("local"):
+        return False
+    from gnomon_expenses.server.client import server_running
 
+    return server_running()
 
-def _file_into_month_folder(pdf: Path, expense: Expense, base_dir: Path) -> Path:
-    """Move a PDF into its YY-MM/ subfolder based on expense date. Returns new path."""
-    import shutil
 
-    if not expense.date:
-        return pdf
+def _get_storage() -> StorageAdapter:
+    if _use_server():
+        from gnomon_expenses.storage.remote import RemoteStorage
 
-    folder_name = expense.date.strftime("%y-%m")  # e.g. "26-01"
-    month_dir = base_dir / folder_name
-    month_dir.mkdir(exist_ok=True)
+        return RemoteStorage()
+    from gnomon_expenses.storage.factory import get_storage
 
-    # Already in the correct monthly folder? Keep it where it is.
-    if pdf.resolve().parent == month_dir.resolve():
-        return pdf
+    return get_storage()
 
-    dest = month_dir / pdf.name
 
-    # Handle name collision (different file, same name)
-    if dest.exists():
-        stem, suffix = pdf.stem, pdf.suffix
-        i = 1
-        while dest.exists():
-            dest = month_dir / f"{stem}_{i}{suffix}"
-            i += 1
+def _print_saved(pdf: Path, expense: Expense, filed: bool) -> None:
+    from gnomon_expenses.models.expense import ExpenseStatus
 
-    shutil.move(str(pdf), str(dest))
-    return dest
+    status_color = "green" if expense.status == ExpenseStatus.PROCESSED else "yellow"
+    filed_to = ""
+    if filed and expense.date:
+        filed_to = f" -> {expense.date.strftime('%y-%m')}/"
+    console.print(
+        f"  [{status_color}]  ok[/{status_color}]  {pdf.name} — "
+        f"{expense.vendor} {expense.currency} {expense.amount_gross} "
+        f"({expense.date}){filed_to}"
+    )
 
 
 @click.group()
-def cli() -> None:
+@click.option("--local", is_flag=True, help="Work on the ledger directly even while `serve` is running")
+def cli(local: bool) -> None:
     """Gnomon Expenses — automated expense tracking for Swiss GmbH."""
 
 
@@ -69,80 +79,135 @@ def cli() -> None:
 @click.option("-r", "--recursive", is_flag=True, help="Scan subdirectories")
 @click.option("--force", is_flag=True, help="Re-process even if already in ledger")
 @click.option("--no-file", is_flag=True, help="Don't move PDFs into monthly folders")
-def process(directory: Path, recursive: bool, force: bool, no_file: bool) -> None:
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Worker processes for extraction")
+@click.option("--no-ai-cache", is_flag=True, help="Ask the AI tier again instead of reusing cached responses")
+@click.option("--full-scan", is_flag=True, help="List every folder again, even ones unchanged since the last run")
+@click.option("--sealed", is_flag=True, help="Skip the already-filed YY-MM/ folders")
+def process(directory: Path, recursive: bool, force: bool, no_file: bool, jobs: int,
+            no_ai_cache: bool, full_scan: bool, sealed: bool) -> None:
     """Process all PDFs in a directory and file them into YY-MM/ folders."""
-    storage = _get_storage()
-    pdfs = _find_pdfs(directory, recursive)
-
-    if not pdfs:
-        console.print("[yellow]No PDF files found.[/yellow]")
+    from gnomon_expenses.hash_cache import hash_cache
+    from gnomon_expenses.ingest import Doc, Ingest
+    from gnomon_expenses.scanner import ScanState, scan
+    from gnomon_expenses.storage.factory import ledger_identity
+
+    # Folders unchanged since the last completed run into this ledger are not
+    # listed again (all of them are with --force or --full-scan)
+    scan_state = ScanState(directory, fresh=force or full_scan, ledger=ledger_identity())
+    if _use_server():
+        _process_remote(directory, scan(directory, recursive, scan_state, sealed), scan_state,
+                        force, no_file, no_ai_cache)
         return
 
-    new_count = 0
-    skip_count = 0
-    fail_count = 0
-
-    for pdf in pdfs:
-        fhash = file_hash(pdf)
-        existing = storage.find_by_hash(fhash)
-
-        if existing and not force:
-            console.print(f"  [dim]skip[/dim]  {pdf.name} (already processed)")
-            skip_count += 1
-            continue
-
-        expense = process_pdf(pdf)
-        if expense is None:
-            console.print(f"  [red]fail[/red]  {pdf.name} (could not extract data)")
-            fail_count += 1
-            continue
-
-        if existing and force:
-            expense.id = existing.id
-
-        # Move PDF into YY-MM/ folder
-        if not no_file:
-            new_path = _file_into_month_folder(pdf, expense, directory.resolve())
-            expense.file_path = str(new_path)
-
-        storage.save(expense)
-        status_color = "green" if expense.status == ExpenseStatus.PROCESSED else "yellow"
-        filed_to = ""
-        if not no_file and expense.date:
-            filed_to = f" -> {expense.date.strftime('%y-%m')}/"
-        console.print(
-            f"  [{status_color}]  ok[/{status_color}]  {pdf.name} — "
-            f"{expense.vendor} {expense.currency} {expense.amount_gross} "
-            f"({expense.date}){filed_to}"
-        )
-        new_count += 1
+    storage = _get_storage()
+    found = 0
+    failed: list[Path] = []
+    started = time.perf_counter()
+
+    def done(doc: Doc) -> None:
+        if doc.status == "ok":
+            _print_saved(doc.path, doc.expense, filed=not no_file)
+        elif doc.status == "skip":
+            console.print(f"  [dim]skip[/dim]  {doc.path.name} ({doc.error})")
+        else:
+            console.print(f"  [red]fail[/red]  {doc.path.name} ({doc.error})")
+            failed.append(doc.path)
+
+    def discover() -> Iterator[str]:
+        nonlocal found
+        for entry in scan(directory, recursive, scan_state, sealed):
+            found += 1
+            yield entry.path
+
+    # Hash, dedupe against the ledger, extract in the workers, run Tier 3 on
+    # the shared client, file and save -- each stage on its own bounded queue.
+    # The persist stage writes the ledger and mirrors once per batch of documents.
+    ingest = Ingest(storage, done, force=force, file_into=None if no_file else directory.resolve(),
+                    use_ai_cache=not no_ai_cache, extract_workers=jobs)
+    ingest.run(discover())
+    hash_cache().save()
+    scan_state.commit(failed, ledger_identity())
+
+    if not found:
+        console.print("[yellow]No new PDF files found.[/yellow]")
+        return
 
-    console.print(f"\nDone: {new_count} processed, {skip_count} skipped, {fail_count} failed")
+    elapsed = time.perf_counter() - started
+    counts = ingest.counts
+    console.print(f"\nDone: {counts['ok']} processed, {counts['skip']} skipped, {counts['fail']} failed "
+                  f"in {elapsed:.1f}s ({found / max(elapsed, 1e-6):.1f} files/s, {jobs} job(s))")
+    console.print(f"  [dim]hash cache: {ingest.cache_hits} of {found} files known by stat[/dim]")
+    for stage in ingest.stats():
+        if stage.items:
+            console.print(f"  [dim]{stage.summary()}[/dim]")
+
+
+def _process_remote(directory: Path, entries: Iterator[os.DirEntry], scan_state: ScanState,
+                    force: bool, no_file: bool, no_ai_cache: bool) -> None:
+    """`process` through the daemon: this side scans, the daemon extracts, files and saves."""
+    from itertools import islice
+
+    from gnomon_expenses.models.expense import Expense
+    from gnomon_expenses.server.client import request
+    from gnomon_expenses.storage.factory import ledger_identity
+
+    counts = {"ok": 0, "skip": 0, "fail": 0}
+    failed: list[Path] = []
+    started = time.perf_counter()
+    paths = (str(Path(e.path).resolve()) for e in entries)
+    # In chunks, so results show up while the rest is still being listed
+    while chunk := list(islice(paths, 32)):
+        results = request("POST", "/submit", {
+            "paths": chunk, "force": force, "ai_cache": not no_ai_cache,
+            "file_into": None if no_file else str(directory.resolve()),
+        }, timeout=None)
+        for r in results:
+            pdf = Path(r["path"])
+            counts[r["status"]] += 1
+            if r["status"] == "ok":
+                _print_saved(pdf, Expense.model_validate(r["expense"]), filed=not no_file)
+            elif r["status"] == "skip":
+                console.print(f"  [dim]skip[/dim]  {pdf.name} (already processed)")
+            else:
+                console.print(f"  [red]fail[/red]  {pdf.name} ({r['error']})")
+                failed.append(pdf)
+    scan_state.commit(failed, ledger_identity())
+
+    found = sum(counts.values())
+    if not found:
+        console.print("[yellow]No new PDF files found.[/yellow]")
+        return
+    elapsed = time.perf_counter() - started
+    console.print(f"\nDone: {counts['ok']} processed, {counts['skip']} skipped, {counts['fail']} failed "
+                  f"in {elapsed:.1f}s ({found / max(elapsed, 1e-6):.1f} files/s, via serve)")
 
 
 @cli.command("list-expenses")
 @click.option("-m", "--month", help="Filter by month (YYYY-MM)")
+@click.option("--from", "date_from", type=click.DateTime(["%Y-%m-%d"]), help="Only from this date on (YYYY-MM-DD)")
+@click.option("--to", "date_to", type=click.DateTime(["%Y-%m-%d"]), help="Only up to this date (YYYY-MM-DD)")
 @click.option("-v", "--vendor", help="Filter by vendor name")
 @click.option("-l", "--label", help="Filter by label")
 @click.option("-c", "--currency", help="Filter by currency")
 @click.option("-s", "--status", type=click.Choice(["processed", "needs_review", "verified"]))
-def list_expenses(month: str | None, vendor: str | None, label: str | None,
-                  currency: str | None, status: str | None) -> None:
+@click.option("-a", "--account", type=int, help="Filter by KMU category account")
+def list_expenses(month: str | None, date_from: datetime | None, date_to: datetime | None,
+                  vendor: str | None, label: str | None, currency: str | None,
+                  status: str | None, account: int | None) -> None:
     """List all expenses with optional filters."""
+    from decimal import Decimal
+
+    from rich.table import Table
+
+    from gnomon_expenses.models.expense import ExpenseStatus
+
     storage = _get_storage()
-    expenses = storage.load_all()
-
-    if month:
-        expenses = [e for e in expenses if e.date and e.date.strftime("%Y-%m") == month]
-    if vendor:
-        v_lower = vendor.lower()
-        expenses = [e for e in expenses if v_lower in e.vendor.lower()]
-    if label:
-        expenses = [e for e in expenses if label in e.labels]
-    if currency:
-        expenses = [e for e in expenses if e.currency.upper() == currency.upper()]
-    if status:
-        expenses = [e for e in expenses if e.status.value == status]
+    date_range = None
+    if date_from or date_to:
+        date_range = (date_from.date() if date_from else None, date_to.date() if date_to else None)
+    expenses = storage.view(month=month, date_range=date_range, vendor=vendor, label=label,
+                            currency=currency, status=status, account=account, order_by="date")
 
     if not expenses:
         console.print("[yellow]No expenses found.[/yellow]")
@@ -162,7 +227,7 @@ def list_expenses(month: str | None, vendor: str | None, label: str | None,
 
     total_by_currency: dict[str, Decimal] = {}
 
-    for e in sorted(expenses, key=lambda x: x.date or date.min):
+    for e in expenses:
         status_style = {
             ExpenseStatus.PROCESSED: "green",
             ExpenseStatus.NEEDS_REVIEW: "yellow",
@@ -199,7 +264,7 @@ def label(expense_id: str, labels: tuple[str, ...]) -> None:
     storage = _get_storage()
     expense = storage.find_by_id(expense_id)
     if not expense:
-        console.print(f"[red]Expense {expense_id!r} not found.[/red]")
+        click.secho(f"Expense {expense_id!r} not found.", fg="red")
         raise SystemExit(1)
 
     for lbl in labels:
@@ -207,7 +272,7 @@ def label(expense_id: str, labels: tuple[str, ...]) -> None:
             expense.labels.append(lbl)
 
     storage.save(expense)
-    console.print(f"Labels on {expense.id}: {', '.join(expense.labels)}")
+    click.echo(f"Labels on {expense.id}: {', '.join(expense.labels)}")
 
 
 @cli.command()
@@ -218,7 +283,7 @@ def note(expense_id: str, text: str) -> None:
     storage = _get_storage()
     expense = storage.find_by_id(expense_id)
     if not expense:
-        console.print(f"[red]Expense {expense_id!r} not found.[/red]")
+        click.secho(f"Expense {expense_id!r} not found.", fg="red")
         raise SystemExit(1)
 
     if expense.notes:
@@ -227,7 +292,7 @@ def note(expense_id: str, text: str) -> None:
         expense.notes = text
 
     storage.save(expense)
-    console.print(f"Note added to {expense.id}")
+    click.echo(f"Note added to {expense.id}")
 
 
 @cli.command("attach-context")
@@ -238,7 +303,7 @@ def attach_context(expense_id: str, file_path: str) -> None:
     storage = _get_storage()
     expense = storage.find_by_id(expense_id)
     if not expense:
-        console.print(f"[red]Expense {expense_id!r} not found.[/red]")
+        click.secho(f"Expense {expense_id!r} not found.", fg="red")
         raise SystemExit(1)
 
     abs_path = str(Path(file_path).resolve())
@@ -246,7 +311,7 @@ def attach_context(expense_id: str, file_path: str) -> None:
         expense.context_files.append(abs_path)
 
     storage.save(expense)
-    console.print(f"Context file attached to {expense.id}: {abs_path}")
+    click.echo(f"Context file attached to {expense.id}: {abs_path}")
 
 
 @cli.command()
@@ -254,26 +319,44 @@ def attach_context(expense_id: str, file_path: str) -> None:
 @click.argument("account", type=int)
 def categorize(expense_id: str, account: int) -> None:
     """Override the category (KMU account number) for an expense."""
+    from gnomon_expenses.models.categories import KMU_ACCOUNTS
+
     acct = KMU_ACCOUNTS.get(account)
     if not acct:
-        console.print(f"[red]Unknown account {account}. Use 'gnomon-expenses categories' to see options.[/red]")
+        click.secho(f"Unknown account {account}. Use 'gnomon-expenses categories' to see options.", fg="red")
         raise SystemExit(1)
 
     storage = _get_storage()
     expense = storage.find_by_id(expense_id)
     if not expense:
-        console.print(f"[red]Expense {expense_id!r} not found.[/red]")
+        click.secho(f"Expense {expense_id!r} not found.", fg="red")
         raise SystemExit(1)
 
     expense.category_account = account
     expense.category_name = acct.name
     storage.save(expense)
-    console.print(f"Category set: {account} — {acct.name}")
+    click.echo(f"Category set: {account} — {acct.name}")
+
+
+@cli.command("forget-ai")
+@click.argument("files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def forget_ai(files: tuple[Path, ...]) -> None:
+    """Drop cached AI responses, so the next run asks the AI tier again."""
+    from gnomon_expenses.extraction.ai_extract import forget_ai as forget
+    from gnomon_expenses.hash_cache import cached_file_hash
+
+    for f in files:
+        state = "forgotten" if forget(cached_file_hash(f)) else "[dim]not cached[/dim]"
+        console.print(f"  {f.name}: {state}")
 
 
 @cli.command()
 def categories() -> None:
     """Show all available KMU account categories."""
+    from rich.table import Table
+
+    from gnomon_expenses.models.categories import list_accounts
+
     table = Table(title="Swiss OR Kontenrahmen KMU — Expense Accounts")
     table.add_column("Account", style="bold", width=8)
     table.add_column("Name", width=30)
@@ -294,9 +377,7 @@ def export(output: Path, month: str | None) -> None:
     import csv
 
     storage = _get_storage()
-    expenses = storage.load_all()
-    if month:
-        expenses = [e for e in expenses if e.date and e.date.strftime("%Y-%m") == month]
+    expenses = storage.view(month=month, order_by="date")
 
     if not expenses:
         console.print("[yellow]No expenses to export.[/yellow]")
@@ -314,7 +395,7 @@ def export(output: Path, month: str | None) -> None:
     with open(output, "w", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fields)
         writer.writeheader()
-        for e in sorted(expenses, key=lambda x: x.date or date.min):
+        for e in expenses:
             writer.writerow({
                 "id": e.id,
                 "date": e.date,
@@ -341,6 +422,32 @@ def export(output: Path, month: str | None) -> None:
     console.print(f"Exported {len(expenses)} expenses to {output}")
 
 
+@cli.command()
+def sync() -> None:
+    """Rewrite the monthly JSON/CSV mirrors and data/ledger.csv from the ledger."""
+    _get_storage().export_mirrors()
+    click.echo("Mirrors written.")
+
+
+@cli.command()
+def compact() -> None:
+    """Fold the ledger journal into a new snapshot (GNOMON_LEDGER_MODE=journal)."""
+    _get_storage().compact()
+    click.echo("Ledger compacted.")
+
+
+@cli.command("migrate-sqlite")
+@click.option("--ledger", type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help="JSON ledger to import (default: data/ledger.json)")
+def migrate_sqlite(ledger: Path | None) -> None:
+    """Import the JSON ledger into the SQLite ledger (data/ledger.db)."""
+    from gnomon_expenses.storage.sqlite import SqliteStorage
+
+    count = SqliteStorage().migrate_from_json(ledger)
+    console.print(f"Imported {count} expenses into the SQLite ledger. "
+                  f"Set GNOMON_STORAGE=sqlite to use it.")
+
+
 @cli.command()
 @click.argument("directory", type=click.Path(exists=True, file_okay=False, path_type=Path), default=".")
 @click.option("-r", "--recursive", is_flag=True, help="Watch subdirectories too")
@@ -352,13 +459,39 @@ def watch(directory: Path, recursive: bool) -> None:
     start_watching(directory, recursive=recursive)
 
 
+@cli.command()
+@click.option("-w", "--workers", type=click.IntRange(min=1), default=None,
+              help="Warm extraction worker processes (default: GNOMON_SERVE_WORKERS)")
+@click.option("--status", "show_status", is_flag=True, help="Show the running server's status and exit")
+def serve(workers: int | None, show_status: bool) -> None:
+    """Keep the pipeline and ledger warm and serve the other commands (Ctrl+C to stop)."""
+    from gnomon_expenses.server.client import request, server_running
+
+    if show_status:
+        if not server_running():
+            click.echo("No server running.")
+            raise SystemExit(1)
+        for key, value in request("GET", "/status").items():
+            click.echo(f"{key}: {value}")
+        return
+
+    from gnomon_expenses.config import SERVE_WORKERS
+    from gnomon_expenses.server.daemon import serve as run
+
+    try:
+        run(workers or SERVE_WORKERS)
+    except RuntimeError as exc:
+        click.secho(str(exc), fg="red")
+        raise SystemExit(1)
+
+
 @cli.command()
 @click.option("-m", "--month", help="Filter by month (YYYY-MM)")
 @click.option("-c", "--currency", help="Filter by currency")
 def report(month: str | None, currency: str | None) -> None:
     """Generate a summary report grouped by category."""
     from gnomon_expenses.reporting.reports import summary_report
-    summary_report(month=month, currency=currency)
+    summary_report(month=month, currency=currency, storage=_get_storage())
 
 
 @cli.command("vat-report")
@@ -366,4 +499,4 @@ def report(month: str | None, currency: str | None) -> None:
 def vat_report(month: str | None) -> None:
     """Generate a MWST/VAT report for tax filing."""
     from gnomon_expenses.reporting.reports import vat_report as _vat_report
-    _vat_report(month=month)
+    _vat_report(month=month, storage=_get_storage())
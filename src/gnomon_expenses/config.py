@@ -6,9 +6,68 @@ from pathlib import Path
 # Base directory for data storage
 DATA_DIR = Path(os.environ.get("GNOMON_DATA_DIR", Path.cwd() / "data"))
 LEDGER_PATH = DATA_DIR / "ledger.json"
+SQLITE_PATH = DATA_DIR / "ledger.db"
+CACHE_DIR = DATA_DIR / "cache"
+
+# Size bound for the extracted-text cache (0 disables it)
+TEXT_CACHE_MAX_MB = int(os.environ.get("GNOMON_TEXT_CACHE_MB", "256"))
+
+# Files whose hash is remembered by (device, inode, size, mtime) (0 disables it)
+HASH_CACHE_ENTRIES = int(os.environ.get("GNOMON_HASH_CACHE_ENTRIES", "200000"))
+
+# Pages OCR'd concurrently (each worker holds one rasterized page)
+OCR_WORKERS = int(os.environ.get("GNOMON_OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Watcher: documents extracted concurrently, and documents waiting for a
+# worker before new events wait (backpressure)
+WATCH_WORKERS = int(os.environ.get("GNOMON_WATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+WATCH_QUEUE = int(os.environ.get("GNOMON_WATCH_QUEUE", "64"))
+
+# Ingestion pipeline: threads hashing files the caches don't know, and the
+# bound on each stage's queue (a full queue holds up the stage before it)
+INGEST_HASH_THREADS = int(os.environ.get("GNOMON_HASH_THREADS", "4"))
+INGEST_QUEUE = int(os.environ.get("GNOMON_INGEST_QUEUE", "64"))
+
+# `serve`: the daemon's Unix socket, and its warm extraction worker processes
+SERVE_SOCKET = Path(os.environ.get("GNOMON_SOCKET", DATA_DIR / "serve.sock"))
+SERVE_WORKERS = int(os.environ.get("GNOMON_SERVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Storage backend: "json" (ledger.json + mirrors) or "sqlite" (ledger.db)
+STORAGE_BACKEND = os.environ.get("GNOMON_STORAGE", "json").lower()
+
+# JSON ledger write mode: "snapshot" rewrites ledger.json on every change,
+# "journal" appends to ledger.json.journal and folds it in periodically
+LEDGER_MODE = os.environ.get("GNOMON_LEDGER_MODE", "snapshot").lower()
+
+# Minimum seconds between rewrites of data/ledger.csv (monthly mirrors are
+# always kept current). 0 rewrites it on every write; negative leaves it to `sync`.
+CSV_SYNC_INTERVAL = float(os.environ.get("GNOMON_CSV_SYNC_INTERVAL", "300"))
 
 # Anthropic API key for AI extraction (Tier 3)
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
+# API endpoint override, e.g. a proxy or a local stand-in server
+ANTHROPIC_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL", "")
+
+# Tier 3 limits: requests in flight, requests started per minute (0 = no
+# limit), seconds per request, and retries on throttling or server errors
+AI_CONCURRENCY = int(os.environ.get("GNOMON_AI_CONCURRENCY", "4"))
+AI_RATE_PER_MINUTE = float(os.environ.get("GNOMON_AI_RATE", "50"))
+AI_TIMEOUT = float(os.environ.get("GNOMON_AI_TIMEOUT", "120"))
+AI_RETRIES = int(os.environ.get("GNOMON_AI_RETRIES", "4"))
+
+# What Tier 3 sends: "auto" (extracted text if there is any, page images for
+# long scans, else the PDF), "text", "pages" (first pages as images) or "document"
+AI_PAYLOAD = os.environ.get("GNOMON_AI_PAYLOAD", "auto").lower()
+AI_MAX_PAGES = int(os.environ.get("GNOMON_AI_MAX_PAGES", "3"))
+AI_MAX_TEXT_CHARS = int(os.environ.get("GNOMON_AI_MAX_TEXT_CHARS", "24000"))
+AI_IMAGE_PX = int(os.environ.get("GNOMON_AI_IMAGE_PX", "1568"))  # longest side of a page image
+# Tier 3 tokens (input + output) one process may spend per window of
+# AI_TOKEN_WINDOW seconds (0 = over its whole lifetime); budget 0 = no limit
+AI_TOKEN_BUDGET = int(os.environ.get("GNOMON_AI_TOKEN_BUDGET", "0"))
+AI_TOKEN_WINDOW = float(os.environ.get("GNOMON_AI_TOKEN_WINDOW", "86400"))
+
+# Size bound for the cache of parsed AI responses (0 disables it)
+AI_CACHE_MAX_MB = int(os.environ.get("GNOMON_AI_CACHE_MB", "64"))
 
 # Default currency for Swiss company
 DEFAULT_CURRENCY = "CHF"
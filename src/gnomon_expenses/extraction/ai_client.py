@@ -0,0 +1,208 @@
+"""Shared Tier 3 API client: pooled connections, concurrency and rate limits, retries.
+
+One `AIClient` per process runs on a background event loop (`ai_runner()`),
+so synchronous callers -- the `process` command, the watcher's timer threads
+-- submit requests from any thread and share one connection pool and one set
+of limits. Set ANTHROPIC_BASE_URL to point it at a proxy or a local stand-in
+server.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Coroutine
+
+from gnomon_expenses.config import (
+    AI_CONCURRENCY,
+    AI_RATE_PER_MINUTE,
+    AI_RETRIES,
+    AI_TIMEOUT,
+    AI_TOKEN_BUDGET,
+    AI_TOKEN_WINDOW,
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_BASE_URL,
+)
+
+log = logging.getLogger(__name__)
+
+# Throttled, overloaded or transient server-side failures; other errors are final
+_RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+_BACKOFF_BASE = 1.0  # seconds before the first retry, doubled per attempt
+_BACKOFF_MAX = 60.0
+
+
+class BudgetExhausted(RuntimeError):
+    """The Tier 3 token budget for the current window cannot cover another request."""
+
+
+class TokenBucket:
+    """Start at most `rate` operations per second on average, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Delay the server asked for, from a Retry-After header in seconds."""
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class AIClient:
+    """Async Messages API client that applies the Tier 3 limits to every request.
+
+    The token budget covers a fixed window of `token_window` seconds from the
+    first request, then starts over, so a one-shot `process` run spends at most
+    one budget and `watch` or `serve` at most one per window.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: str = ANTHROPIC_API_KEY,
+        base_url: str = ANTHROPIC_BASE_URL,
+        concurrency: int = AI_CONCURRENCY,
+        rate_per_minute: float = AI_RATE_PER_MINUTE,
+        timeout: float = AI_TIMEOUT,
+        retries: int = AI_RETRIES,
+        token_budget: int = AI_TOKEN_BUDGET,
+        token_window: float = AI_TOKEN_WINDOW,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url or None
+        self.timeout = timeout
+        self.retries = retries
+        self.token_budget = token_budget
+        self.token_window = token_window
+        self.tokens_used = 0  # in the current window
+        self._window_start: float | None = None
+        self._tokens_reserved = 0  # estimates of requests in flight
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._bucket = (TokenBucket(rate_per_minute / 60, burst=concurrency)
+                        if rate_per_minute > 0 else None)
+        self._sdk: Any = None
+
+    def _messages(self) -> Any:
+        if self._sdk is None:
+            import anthropic
+
+            # Retries are ours, so they share the rate limit and get logged
+            self._sdk = anthropic.AsyncAnthropic(
+                api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=0,
+            )
+        return self._sdk.messages
+
+    async def create(self, *, estimate: int = 0, **kwargs: Any) -> tuple[Any, float]:
+        """`messages.create`, retrying throttling, server errors, timeouts and dropped connections.
+
+        Returns the message and the seconds the successful attempt took.
+        `estimate` is the request's expected token count; with a token budget
+        set, a request that would overrun it raises BudgetExhausted unsent.
+        """
+        if self.token_budget > 0:
+            now = time.monotonic()
+            if self._window_start is None or 0 < self.token_window <= now - self._window_start:
+                self._window_start = now
+                self.tokens_used = 0
+            committed = self.tokens_used + self._tokens_reserved
+            if committed + estimate > self.token_budget:
+                raise BudgetExhausted(
+                    f"token budget exhausted ({committed} of {self.token_budget} used or in flight, "
+                    f"request needs ~{estimate})")
+        self._tokens_reserved += estimate
+        try:
+            message, seconds = await self._create(kwargs)
+        finally:
+            self._tokens_reserved -= estimate
+        usage = getattr(message, "usage", None)
+        if usage is not None:
+            self.tokens_used += (usage.input_tokens or 0) + (usage.output_tokens or 0)
+        else:
+            self.tokens_used += estimate
+        return message, seconds
+
+    async def _create(self, kwargs: dict[str, Any]) -> tuple[Any, float]:
+        import anthropic
+
+        attempt = 0
+        while True:
+            async with self._slots:
+                if self._bucket is not None:
+                    await self._bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    message = await self._messages().create(**kwargs)
+                    return message, time.perf_counter() - start
+                except (anthropic.APIStatusError, anthropic.APIConnectionError) as exc:
+                    status = getattr(exc, "status_code", None)
+                    if attempt >= self.retries or (status is not None and status not in _RETRY_STATUS):
+                        raise
+                    reason = f"HTTP {status}" if status is not None else type(exc).__name__
+                    delay = _retry_after(exc)
+            # Back off outside the semaphore so other requests can use the slot
+            if delay is None:
+                delay = min(_BACKOFF_MAX, _BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            log.warning("AI request failed (%s), retry %d/%d in %.1fs", reason, attempt, self.retries, delay)
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        if self._sdk is not None:
+            await self._sdk.close()
+            self._sdk = None
+
+
+class AIRunner:
+    """An `AIClient` on its own event loop thread, for synchronous callers."""
+
+    def __init__(self, client: AIClient | None = None) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gnomon-ai", daemon=True)
+        self._thread.start()
+        self.client = client or AIClient()
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Schedule `coro` on the runner's loop; safe to call from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def close(self) -> None:
+        self.submit(self.client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_runner: AIRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def ai_runner() -> AIRunner:
+    """The process-wide runner, started on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AIRunner()
+        return _runner
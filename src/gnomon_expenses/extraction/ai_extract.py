@@ -1,13 +1,25 @@
-"""Tier 3: AI extraction using Claude API for documents that resist text/OCR parsing."""
+"""Tier 3: AI extraction using Claude API for documents that resist text/OCR parsing.
+
+What is sent is chosen by `ai_payload` (GNOMON_AI_PAYLOAD). Parsed responses
+are cached per file hash, model, prompt and payload strategy in
+`data/cache/ai`, so re-processing a document does not call the API again.
+"""
 
 from __future__ import annotations
 
-import base64
+import asyncio
+import hashlib
+import json
+from concurrent.futures import Future
 from datetime import date
 from decimal import Decimal
 from pathlib import Path
+from typing import Any
 
-from gnomon_expenses.config import ANTHROPIC_API_KEY
+from gnomon_expenses.cache import DiskCache
+from gnomon_expenses.config import AI_CACHE_MAX_MB, AI_PAYLOAD
+from gnomon_expenses.extraction import ai_payload
+from gnomon_expenses.extraction.ai_client import AIClient, ai_runner
 from gnomon_expenses.models.expense import (
     Expense,
     ExtractionMethod,
@@ -23,54 +35,120 @@ vat_rate, vat_amount, vat_number, category_account (Swiss KMU: 6570=licenses,
 6810=hosting/servers, 6820=API/SaaS/AI, 6830=telecom, 6840=domains, 6850=SaaS subscriptions),
 category_name.
 """
+USER_PROMPT = "Extract expense data from this document as JSON."
+
+MODEL = "claude-sonnet-4-5-20250929"
+MAX_TOKENS = 1024
 
+_cache = DiskCache("ai", AI_CACHE_MAX_MB * 1024 * 1024)
+# Changing either prompt or the model makes earlier responses unreachable
+_PROMPT_HASH = hashlib.sha256(f"{SYSTEM_PROMPT}\0{USER_PROMPT}".encode()).hexdigest()[:16]
 
-def extract_with_ai(path: str | Path, fhash: str) -> Expense | None:
-    """Use Claude API to extract expense data from a PDF."""
-    if not ANTHROPIC_API_KEY:
-        return None
 
-    import anthropic
-    import json
+def _cache_key(fhash: str, strategy: str) -> str:
+    return f"{fhash}-{MODEL}-{_PROMPT_HASH}-{strategy}"
 
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
-    pdf_bytes = Path(path).read_bytes()
-    pdf_b64 = base64.standard_b64encode(pdf_bytes).decode("ascii")
+def forget_ai(fhash: str) -> bool:
+    """Drop the cached responses for a document. Returns whether there were any."""
+    dropped = [_cache.delete(_cache_key(fhash, s)) for s in ai_payload.STRATEGIES if s != "auto"]
+    return any(dropped)
 
-    message = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=1024,
+
+def _request(payload: ai_payload.Payload) -> dict:
+    return dict(
+        model=MODEL,
+        max_tokens=MAX_TOKENS,
         system=SYSTEM_PROMPT,
         messages=[
             {
                 "role": "user",
                 "content": [
-                    {
-                        "type": "document",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "application/pdf",
-                            "data": pdf_b64,
-                        },
-                    },
+                    *payload.content,
                     {
                         "type": "text",
-                        "text": "Extract expense data from this document as JSON.",
+                        "text": USER_PROMPT,
                     },
                 ],
             }
         ],
     )
 
+
+def _send(path: str | Path, pages: list[str] | None, strategy: str) -> tuple[dict, int, int]:
+    payload = ai_payload.build(strategy, path, pages)
+    request = _request(payload)
+    return request, len(json.dumps(request)), payload.estimate + MAX_TOKENS
+
+
+async def extract_with_ai_async(path: str | Path, fhash: str, client: AIClient,
+                                pages: list[str] | None = None, use_cache: bool = True,
+                                strategy: str = AI_PAYLOAD) -> Expense | None:
+    """Use Claude API to extract expense data from a PDF, within `client`'s limits.
+
+    `pages` is the text tiers 1 and 2 extracted, if any. With use_cache=False
+    the cached response is ignored, and replaced.
+    """
+    strategy = await asyncio.to_thread(ai_payload.resolve, strategy, path, pages)
+    key = _cache_key(fhash, strategy)
+    entry = _cache.get_json(key) if use_cache else None
+    if entry is None:
+        if not client.api_key:
+            return None
+        request, size, estimate = await asyncio.to_thread(_send, path, pages, strategy)
+        message, seconds = await client.create(estimate=estimate, **request)
+        entry = {
+            "data": _parse_response(message),
+            "payload": strategy,
+            "request_bytes": size,
+            "latency_ms": round(seconds * 1000),
+        }
+        _cache.put_json(key, entry)
+    return _to_expense(path, fhash, entry)
+
+
+def submit_ai(path: str | Path, fhash: str, pages: list[str] | None = None,
+              use_cache: bool = True) -> Future:
+    """Queue AI extraction on the shared client; the future resolves to an Expense or None.
+
+    A cached response resolves immediately, without starting the client.
+    """
+    done: Future = Future()
+    try:
+        strategy = ai_payload.resolve(AI_PAYLOAD, path, pages)
+        entry = _cache.get_json(_cache_key(fhash, strategy)) if use_cache else None
+        if entry is not None:
+            done.set_result(_to_expense(path, fhash, entry))
+    except Exception as exc:
+        done.set_exception(exc)
+    if done.done():
+        return done
+    runner = ai_runner()
+    return runner.submit(extract_with_ai_async(path, fhash, runner.client, pages,
+                                               use_cache=False, strategy=strategy))
+
+
+def extract_with_ai(path: str | Path, fhash: str, pages: list[str] | None = None,
+                    use_cache: bool = True) -> Expense | None:
+    """Use Claude API to extract expense data from a PDF (blocking).
+
+    Calls from several threads run concurrently on the shared client.
+    """
+    return submit_ai(path, fhash, pages, use_cache).result()
+
+
+def _parse_response(message: Any) -> dict:
     response_text = message.content[0].text
     # Strip markdown code fences if present
     if response_text.startswith("```"):
         lines = response_text.split("\n")
         response_text = "\n".join(lines[1:-1])
 
-    data = json.loads(response_text)
+    return json.loads(response_text)
+
 
+def _to_expense(path: str | Path, fhash: str, entry: dict) -> Expense:
+    data = entry["data"]
     expense_date = None
     if data.get("date"):
         try:
@@ -97,6 +175,9 @@ def extract_with_ai(path: str | Path, fhash: str) -> Expense | None:
         category_account=data.get("category_account"),
         category_name=data.get("category_name", ""),
         extraction_method=ExtractionMethod.AI,
+        ai_payload=entry["payload"],
+        ai_request_bytes=entry["request_bytes"],
+        ai_latency_ms=entry["latency_ms"],
         extraction_confidence=0.8,
         status=ExpenseStatus.NEEDS_REVIEW,
     )
@@ -0,0 +1,141 @@
+"""Tier 3 request payloads: what to send for a document, and roughly what it costs.
+
+Strategies, cheapest first:
+
+- text: the text tiers 1 and 2 already extracted. When it is longer than
+  AI_MAX_TEXT_CHARS, only the first page and the pages mentioning totals are
+  kept, then it is cut at the limit.
+- pages: the first AI_MAX_PAGES pages, rendered as JPEGs whose longest side
+  is at most AI_IMAGE_PX (large scans are downscaled, not re-sent as is).
+- document: the whole PDF as a document block.
+
+"auto" sends text when there is any, page images for scans longer than
+AI_MAX_PAGES, and the document otherwise.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import pdfplumber
+
+from gnomon_expenses.config import AI_IMAGE_PX, AI_MAX_PAGES, AI_MAX_TEXT_CHARS
+
+STRATEGIES = ("auto", "text", "pages", "document")
+
+# Pages worth keeping when extracted text has to be cut down
+_TOTALS = re.compile(r"total|gesamt|summe|betrag|amount due|balance|mwst|vat\b|tva|montant", re.IGNORECASE)
+
+# Rough input token costs, for the budget: characters per text token, pixels
+# per image token, and tokens per PDF page (its text plus a page image)
+_CHARS_PER_TOKEN = 4
+_PIXELS_PER_TOKEN = 750
+_TOKENS_PER_PDF_PAGE = 2500
+# File bytes per page, to guess the page count of a PDF pdfplumber cannot open
+_BYTES_PER_PDF_PAGE = 100_000
+
+_RENDER_DPI = 150  # upper bound; large pages render lower to fit AI_IMAGE_PX
+
+
+@dataclass
+class Payload:
+    strategy: str
+    content: list[dict]  # content blocks sent ahead of the prompt
+    estimate: int  # expected input tokens
+
+
+def _has_text(pages: list[str] | None) -> bool:
+    return bool(pages) and any(p.strip() for p in pages)
+
+
+def _page_count(path: str | Path) -> int | None:
+    """Pages in the PDF, or None if pdfplumber cannot open it (the document is sent as is)."""
+    try:
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return None
+
+
+def resolve(strategy: str, path: str | Path, pages: list[str] | None) -> str:
+    """The strategy actually used for a document.
+
+    "text" needs text to send and "pages" a PDF pdfplumber can open; otherwise
+    the document goes as is.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown GNOMON_AI_PAYLOAD {strategy!r} (expected one of {', '.join(STRATEGIES)})")
+    if strategy == "auto":
+        if _has_text(pages):
+            return "text"
+        count = _page_count(path)
+        return "pages" if count is not None and count > AI_MAX_PAGES else "document"
+    if strategy == "text" and not _has_text(pages):
+        return "document"
+    if strategy == "pages" and _page_count(path) is None:
+        return "document"
+    return strategy
+
+
+def select_text(pages: list[str], limit: int = AI_MAX_TEXT_CHARS) -> str:
+    """Page texts joined, cut down to the first page and the pages with totals if too long."""
+    pages = [p for p in pages if p.strip()]
+    text = "\n\n".join(pages)
+    if len(text) > limit:
+        keep = [p for i, p in enumerate(pages) if i == 0 or _TOTALS.search(p)]
+        text = "\n\n".join(keep)
+    return text[:limit]
+
+
+def _text_payload(pages: list[str]) -> Payload:
+    text = select_text(pages)
+    block = {"type": "text", "text": f"<document>\n{text}\n</document>"}
+    return Payload("text", [block], len(text) // _CHARS_PER_TOKEN + 1)
+
+
+def _pages_payload(path: str | Path) -> Payload:
+    content = []
+    estimate = 0
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[:AI_MAX_PAGES]:
+            try:
+                dpi = min(_RENDER_DPI, AI_IMAGE_PX * 72 / max(page.width, page.height))
+                image = page.to_image(resolution=dpi).original.convert("RGB")
+            finally:
+                page.close()
+            buf = io.BytesIO()
+            image.save(buf, format="JPEG", quality=80)
+            estimate += image.width * image.height // _PIXELS_PER_TOKEN
+            content.append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": "image/jpeg",
+                    "data": base64.standard_b64encode(buf.getvalue()).decode("ascii"),
+                },
+            })
+    return Payload("pages", content, estimate)
+
+
+def _document_payload(path: str | Path) -> Payload:
+    data = Path(path).read_bytes()
+    pdf_b64 = base64.standard_b64encode(data).decode("ascii")
+    block = {
+        "type": "document",
+        "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_b64},
+    }
+    count = _page_count(path) or -(-len(data) // _BYTES_PER_PDF_PAGE)
+    return Payload("document", [block], max(1, count) * _TOKENS_PER_PDF_PAGE)
+
+
+def build(strategy: str, path: str | Path, pages: list[str] | None) -> Payload:
+    """Content blocks for a resolved strategy (see `resolve`)."""
+    if strategy == "text":
+        return _text_payload(pages or [])
+    if strategy == "pages":
+        return _pages_payload(path)
+    return _document_payload(path)
@@ -1,20 +1,88 @@
-"""Tier 2: OCR fallback using Tesseract for scanned PDFs."""
+"""Tier 2: OCR fallback using Tesseract for scanned PDFs.
 
+Pages are rasterized and OCR'd one at a time, a few in parallel, and yielded
+in page order, so memory is bounded by the number of workers rather than the
+page count. Each page is first read at OCR_FAST_DPI; only pages whose text
+comes out too sparse to parse are rasterized again at OCR_DPI.
+"""
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 from pathlib import Path
 
+from gnomon_expenses.config import OCR_WORKERS
 
-def extract_text_ocr(path: str | Path) -> str:
-    """Extract text from a scanned PDF via Tesseract OCR.
+OCR_DPI = 300
+OCR_FAST_DPI = 150
+OCR_LANG = "eng+deu"
+# Pages with fewer letters and digits than this at OCR_FAST_DPI are redone at OCR_DPI
+OCR_MIN_CHARS = 80
 
-    Requires: pytesseract, Pillow, pdf2image (install with `pip install gnomon-expenses[ocr]`).
-    """
+
+@cache
+def backend_version() -> str:
+    """Tesseract version and settings, recorded with cached OCR text."""
+    import pytesseract
+
+    return (f"tesseract {pytesseract.get_tesseract_version()} {OCR_LANG} "
+            f"{OCR_FAST_DPI}/{OCR_DPI}dpi min{OCR_MIN_CHARS}")
+
+
+def _ocr(path: str, number: int, dpi: int) -> str:
     from pdf2image import convert_from_path
     import pytesseract
 
-    images = convert_from_path(str(path), dpi=300)
-    pages = []
-    for img in images:
-        text = pytesseract.image_to_string(img, lang="eng+deu")
-        if text.strip():
-            pages.append(text)
-    return "\n\n".join(pages)
+    images = convert_from_path(path, dpi=dpi, first_page=number, last_page=number)
+    try:
+        return pytesseract.image_to_string(images[0], lang=OCR_LANG) if images else ""
+    finally:
+        for img in images:
+            img.close()
+
+
+def _sparse(text: str) -> bool:
+    return sum(ch.isalnum() for ch in text) < OCR_MIN_CHARS
+
+
+def ocr_page(path: str | Path, number: int) -> str:
+    """OCR one page (1-based), at full resolution only if the fast pass is too sparse."""
+    text = _ocr(str(path), number, OCR_FAST_DPI)
+    if _sparse(text) and OCR_FAST_DPI < OCR_DPI:
+        text = _ocr(str(path), number, OCR_DPI)
+    return text if text.strip() else ""
+
+
+def ocr_pages(path: str | Path, numbers: Iterable[int], workers: int = OCR_WORKERS) -> Iterator[str]:
+    """Yield the OCR text of the given pages (1-based) in order, running up to `workers` ahead.
+
+    Requires: pytesseract, Pillow, pdf2image (install with `pip install gnomon-expenses[ocr]`).
+    Closing the generator early cancels pages not yet started.
+    """
+    numbers = iter(numbers)
+    workers = max(1, workers)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = deque(pool.submit(ocr_page, path, n) for _, n in zip(range(workers), numbers))
+        while pending:
+            text = pending.popleft().result()
+            n = next(numbers, None)
+            if n is not None:
+                pending.append(pool.submit(ocr_page, path, n))
+            yield text
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pages_ocr(path: str | Path, start: int = 0, workers: int = OCR_WORKERS) -> Iterator[str]:
+    """Yield OCR text for every page from page index `start` on."""
+    from pdf2image import pdfinfo_from_path
+
+    count = int(pdfinfo_from_path(str(path))["Pages"])
+    yield from ocr_pages(path, range(start + 1, count + 1), workers)
+
+
+def extract_text_ocr(path: str | Path) -> str:
+    """Extract text from a scanned PDF via Tesseract OCR."""
+    return "\n\n".join(text for text in iter_pages_ocr(path) if text)
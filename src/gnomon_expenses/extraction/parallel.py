@@ -0,0 +1,105 @@
+"""Process-pool tasks and per-stage counters for the ingestion pipeline.
+
+The extract stage runs `extract_task` in worker processes started with
+`init_worker`; a task that kills its worker is re-run alone with
+`run_isolated` so only that document fails.
+
+Pools are created while the pipeline's threads are running, and a plain
+fork copies whatever locks those threads hold at that moment (an import
+in progress, say) into a child that then waits on them forever. Workers
+are therefore forked from a forkserver, a clean single-threaded process
+that already has the extraction pipeline imported.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from gnomon_expenses.models.expense import Expense
+
+
+@dataclass
+class StageStats:
+    """Throughput and queue counters for one stage of the pipeline."""
+
+    name: str
+    items: int = 0
+    bytes: int = 0
+    seconds: float = 0.0  # busy time summed over all workers
+    started: float | None = None  # perf_counter() when the first item started
+    finished: float = 0.0  # ... and when the last one finished
+    queue_size: int = 0
+    queue_peak: int = 0
+
+    def add(self, seconds: float, nbytes: int = 0, items: int = 1) -> None:
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now - seconds
+        self.finished = now
+        self.items += items
+        self.bytes += nbytes
+        self.seconds += seconds
+
+    def seen_depth(self, depth: int) -> None:
+        self.queue_peak = max(self.queue_peak, depth)
+
+    def summary(self) -> str:
+        wall = self.finished - self.started if self.started is not None else 0.0
+        rate = self.items / wall if wall else 0.0
+        line = f"{self.name}: {self.items} files in {wall:.2f}s ({rate:.1f}/s"
+        if self.bytes and wall:
+            line += f", {self.bytes / wall / 1_000_000:.1f} MB/s"
+        line += f"), {self.seconds:.2f}s busy"
+        if self.queue_size:
+            line += f", queue peak {self.queue_peak}/{self.queue_size}"
+        return line
+
+
+def init_worker() -> None:
+    """Pool initializer for extraction workers.
+
+    Workers already run side by side, each OCR'ing several pages at once
+    (GNOMON_OCR_WORKERS), so Tesseract's own OpenMP threads would only
+    oversubscribe the cores: its subprocesses get OMP_THREAD_LIMIT=1 unless
+    the environment sets a limit. Only the worker's environment changes.
+    """
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def extract_task(item: tuple[Path, str]) -> tuple[Expense | None, float, list[str] | None]:
+    """Worker task: run extraction tiers 1 and 2. Returns (expense, seconds, ai_pages).
+
+    Documents that need Tier 3 are handed back rather than sent from the worker,
+    so the parent can run all of them concurrently on one rate-limited client.
+    """
+    from gnomon_expenses.extraction.pipeline import extract_local
+
+    path, fhash = item
+    start = time.perf_counter()
+    expense, ai_pages = extract_local(path, fhash)
+    return expense, time.perf_counter() - start, ai_pages
+
+
+_CONTEXT = multiprocessing.get_context("forkserver")
+_CONTEXT.set_forkserver_preload(["gnomon_expenses.extraction.pipeline"])
+
+
+def make_pool(workers: int, initializer: Callable[[], None] = init_worker) -> ProcessPoolExecutor:
+    """A pool of extraction worker processes, forked from the forkserver."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_CONTEXT, initializer=initializer)
+
+
+def run_isolated(fn: Callable[[Any], Any], item: Any,
+                 initializer: Callable[[], None] = init_worker) -> tuple[Any, BaseException | None]:
+    """Run one task in a private single-worker pool."""
+    with make_pool(1, initializer) as solo:
+        try:
+            return solo.submit(fn, item).result(), None
+        except Exception as exc:
+            return None, exc
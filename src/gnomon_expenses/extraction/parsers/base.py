@@ -28,14 +28,34 @@ class ParseResult:
         self.category_account: int | None = None
         self.category_name: str = ""
         self.confidence: float = 1.0
+        # Fields the parser actually found (or knows, e.g. a fixed vendor);
+        # compared against VendorParser.required_fields to stop extraction early
+        self.found: set[str] = set()
 
 
 class VendorParser(ABC):
     """Base class all vendor parsers inherit from."""
 
-    @abstractmethod
+    # Substrings that identify the vendor's documents: the parser matches when
+    # every string of at least one group occurs in the text. The pipeline
+    # searches each distinct string at most once; see extraction/dispatch.py.
+    fingerprints: tuple[tuple[str, ...], ...] = ()
+
+    # Once a parse of the first pages has found all of these, the remaining
+    # pages are not extracted. Parsers that don't fill `ParseResult.found`
+    # never stop early.
+    required_fields: tuple[str, ...] = ("vendor", "date", "amount_gross", "vat_amount")
+    # Whether a parse can ever find all of `required_fields`; the pipeline
+    # only re-parses page by page for parsers that can
+    stops_early: bool = False
+
     def can_parse(self, text: str) -> bool:
         """Return True if this parser recognizes the document text."""
+        return any(all(s in text for s in group) for group in self.fingerprints)
+
+    def missing(self, result: ParseResult) -> set[str]:
+        """Required fields `result` has not found yet."""
+        return set(self.required_fields) - result.found
 
     @abstractmethod
     def parse(self, text: str) -> ParseResult | None:
@@ -0,0 +1,215 @@
+"""Declarative vendor parsers: precompiled rules plus post-processors.
+
+A vendor parser is a `SpecParser` subclass that lists its defaults and its
+rules. Each rule is one regex, compiled once at class creation, whose groups
+feed one or more `ParseResult` fields through small extractor functions:
+
+    class AcmeParser(SpecParser):
+        vendor_name = "Acme"
+        fingerprints = (("Acme Corp",),)
+        defaults = {"vendor": "Acme", "currency": "USD", "category_account": 6820}
+        rules = (
+            rule(r"Invoice date:\\s*(\\d{2}/\\d{2}/\\d{4})", date=dmy()),
+            rule(r"Total\\s+\\$([0-9,]+\\.\\d{2})", amount_gross=money()),
+        )
+
+Rules run in order and the first rule to produce a field wins, so a later
+rule for the same field is a fallback and is skipped once it is filled.
+A default counts as found (see `ParseResult.found`) only for fields no rule
+sets; a rule-settable field is found once a rule has matched it.
+Patterns that open with a character class (an amount, a date) would be tried
+at every offset of the text; a rule can declare a literal such a match
+contains (`anchor`) and the characters allowed before it (`lead`), and the
+engine then finds that literal first and starts the regex search just before
+it. `python scripts/bench_rules.py` times the anchored rules both ways.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, ClassVar, Literal
+
+from gnomon_expenses.extraction.parsers.base import ParseResult, VendorParser
+
+# Extractor: match (or, for `every=True` rules, the list of matches) -> field value.
+# Returning None leaves the field unset.
+Extract = Callable[[Any], Any]
+
+
+# --- extractors --------------------------------------------------------------
+
+def text(group: int = 1) -> Extract:
+    return lambda m: m.group(group)
+
+
+def stripped(group: int = 1) -> Extract:
+    return lambda m: m.group(group).strip()
+
+
+def words(group: int = 1) -> Extract:
+    """Collapse runs of whitespace, e.g. a receipt number wrapped over lines."""
+    return lambda m: " ".join(m.group(group).split())
+
+
+def money(group: int = 1) -> Extract:
+    """'1,234.50' -> Decimal('1234.50')."""
+    return lambda m: Decimal(m.group(group).replace(",", ""))
+
+
+def number(group: int = 1) -> Extract:
+    return lambda m: Decimal(m.group(group))
+
+
+def dmy(group: int = 1) -> Extract:
+    """'31/01/2026' -> '2026-01-31'."""
+    def extract(m: re.Match) -> str:
+        day, month, year = m.group(group).split("/")
+        return f"{year}-{month}-{day}"
+    return extract
+
+
+def mdy(group: int = 1) -> Extract:
+    """'2/1/2026' -> '2026-02-01'."""
+    def extract(m: re.Match) -> str:
+        month, day, year = m.group(group).split("/")
+        return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+    return extract
+
+
+def strpdate(fmt: str, group: int = 1) -> Extract:
+    """Parse with `fmt` into an ISO date; unparseable dates leave the field unset."""
+    def extract(m: re.Match) -> str | None:
+        try:
+            return datetime.strptime(m.group(group).strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            return None
+    return extract
+
+
+def template(fmt: str) -> Extract:
+    """Format the match groups: '{0} - {1}' uses groups 1 and 2."""
+    return lambda m: fmt.format(*m.groups())
+
+
+# --- rules and the engine ----------------------------------------------------
+
+# How far back from an anchor literal to look for where a match can start
+_WINDOW = 256
+
+
+@dataclass(frozen=True)
+class Rule:
+    pattern: re.Pattern
+    fields: dict[str, Extract]
+    every: bool = False  # extractors get all matches (finditer) instead of the first
+    clean: bool = False  # match against the text with NUL bytes replaced by spaces
+    anchor: str = ""  # literal every match contains (see rule())
+    breaker: re.Pattern | None = None  # a character that cannot precede it within a match
+
+
+def rule(pattern: str, flags: int = 0, *, every: bool = False, clean: bool = False,
+         anchor: str = "", lead: str = "", **fields: Extract) -> Rule:
+    """A rule; `anchor` and `lead` declare a prefilter for patterns that open with a class.
+
+    `anchor` is a literal every match contains and `lead` (character-class
+    contents, e.g. r"\\d.\\s") the characters a match can have before it. The
+    search then starts where the run of `lead` characters before the
+    anchor's first occurrence begins, instead of at every offset.
+    """
+    if bool(anchor) != bool(lead):
+        raise ValueError("rule(): anchor and lead go together")
+    if anchor and anchor not in pattern:
+        raise ValueError(f"rule(): anchor {anchor!r} does not occur in {pattern!r}")
+    breaker = re.compile(f"[^{lead}]", flags & re.ASCII) if lead else None
+    return Rule(re.compile(pattern, flags), fields, every, clean, anchor, breaker)
+
+
+def _searcher(spec: Rule) -> Callable[[str], Any]:
+    """Match function for a rule: the first match, or the list of all of them."""
+    pattern, every = spec.pattern, spec.every
+    if not spec.anchor:
+        return (lambda haystack: list(pattern.finditer(haystack))) if every else pattern.search
+    anchor, breaker = spec.anchor, spec.breaker
+    assert breaker is not None
+
+    def search(haystack: str) -> Any:
+        at = haystack.find(anchor)
+        if at < 0:
+            return None
+        # Walk back over the characters a match may contain before the anchor
+        lo = max(0, at - _WINDOW)
+        stop = breaker.search(haystack[lo:at][::-1])
+        start = at - stop.start() if stop else 0
+        return list(pattern.finditer(haystack, start)) if every else pattern.search(haystack, start)
+
+    return search
+
+
+class SpecParser(VendorParser):
+    """Vendor parser driven by `defaults` and `rules` class attributes."""
+
+    defaults: ClassVar[dict[str, Any]] = {}
+    rules: ClassVar[tuple[Rule, ...]] = ()
+    # Net amount when no rule found one: equal to gross, or gross minus VAT
+    net_fallback: ClassVar[Literal["gross", "gross_minus_vat"] | None] = None
+
+    # Rules flattened once per class into (names, extractors, search, clean,
+    # tracked) tuples. Only fields more than one rule can set, amount_net (for
+    # net_fallback) and the required fields are tracked; other rules skip that.
+    _plan: ClassVar[tuple[tuple, ...]] = ()
+    # Defaults no rule can override: known for every document of the vendor
+    _fixed: ClassVar[frozenset[str]] = frozenset()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        seen: set[str] = set()
+        tracked = {"amount_net", *cls.required_fields}
+        for spec in cls.rules:
+            tracked |= seen.intersection(spec.fields)
+            seen.update(spec.fields)
+        cls._fixed = frozenset(cls.defaults).difference(seen)
+        cls.stops_early = set(cls.required_fields) <= seen | cls._fixed
+        cls._plan = tuple(
+            (tuple(spec.fields), tuple(spec.fields.values()), _searcher(spec), spec.clean,
+             not tracked.isdisjoint(spec.fields))
+            for spec in cls.rules
+        )
+
+    def parse(self, text: str) -> ParseResult | None:
+        r = ParseResult()
+        r.__dict__.update(self.defaults)
+
+        clean: str | None = None
+        filled: set[str] = set()
+        for names, extracts, search, needs_clean, tracked in self._plan:
+            if tracked and filled.issuperset(names):
+                continue
+            if needs_clean:
+                if clean is None:
+                    # pdfplumber sometimes inserts \x00 bytes in the extracted text
+                    clean = text.replace("\x00", " ")
+                haystack = clean
+            else:
+                haystack = text
+            match = search(haystack)
+            if not match:
+                continue
+            for name, extract in zip(names, extracts):
+                if tracked and name in filled:
+                    continue
+                value = extract(match)
+                if value is not None:
+                    setattr(r, name, value)
+                    if tracked:
+                        filled.add(name)
+
+        r.found = filled | self._fixed
+        if "amount_net" not in filled:
+            if self.net_fallback == "gross":
+                r.amount_net = r.amount_gross
+            elif self.net_fallback == "gross_minus_vat":
+                r.amount_net = r.amount_gross - r.vat_amount
+        return r
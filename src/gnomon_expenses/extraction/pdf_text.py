@@ -1,19 +1,72 @@
 """Tier 1: Extract text from PDF using pdfplumber."""
 
+import re
+from collections.abc import Iterator
 from pathlib import Path
 
 import pdfplumber
 
+# Recorded with cached text; a different version invalidates the cache entry.
+# The suffix names the cached page format (text plus image coverage).
+BACKEND_VERSION = f"pdfplumber {pdfplumber.__version__} p2"
+
+# Text-layer quality thresholds: a page failing them is OCR'd instead
+MIN_PAGE_CHARS = 20  # fewer visible characters: blank or scanned
+MAX_GARBAGE_RATIO = 0.3  # share of unmapped glyphs / replacement characters
+SCAN_COVERAGE = 0.5  # images covering this much of the page...
+SCAN_MAX_CHARS = 200  # ...with less text than this: a scan with a printed header or stamp
+
+# pdfplumber renders glyphs without a Unicode mapping as "(cid:NN)"; broken
+# encodings also show up as replacement or private-use characters
+_GARBAGE = re.compile(r"\(cid:\d+\)|[\ufffd\ue000-\uf8ff]")
+
+
+def _image_coverage(page: "pdfplumber.page.Page") -> float:
+    """Fraction of the page area covered by images (overlaps counted twice, capped at 1)."""
+    x0, top, x1, bottom = page.bbox
+    area = (x1 - x0) * (bottom - top)
+    if area <= 0:
+        return 0.0
+    covered = 0.0
+    for img in page.images:
+        w = min(img["x1"], x1) - max(img["x0"], x0)
+        h = min(img["bottom"], bottom) - max(img["top"], top)
+        if w > 0 and h > 0:
+            covered += w * h
+    return min(1.0, covered / area)
+
+
+def is_deficient(text: str, image_coverage: float) -> bool:
+    """Whether a page's text layer is too poor to use, so the page should be OCR'd."""
+    visible = len("".join(text.split()))
+    if visible < MIN_PAGE_CHARS:
+        return True
+    garbage = sum(len(g) for g in _GARBAGE.findall(text))
+    if garbage > MAX_GARBAGE_RATIO * visible:
+        return True
+    return image_coverage >= SCAN_COVERAGE and visible < SCAN_MAX_CHARS
+
+
+def iter_pages(path: str | Path, start: int = 0) -> Iterator[tuple[str, float]]:
+    """Yield (text, image coverage) for each page from `start` on, extracting lazily.
+
+    Each page's parsed layout is released once it has been read, so memory
+    stays at one page however long the document is. Pages without text
+    yield "". Errors propagate; the caller decides what a failed read means.
+    """
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[start:]:
+            try:
+                text = page.extract_text() or ""
+                coverage = _image_coverage(page)
+            finally:
+                page.close()
+            yield text, coverage
+
 
 def extract_text(path: str | Path) -> str:
     """Extract all text from a PDF file. Returns empty string on failure."""
     try:
-        with pdfplumber.open(path) as pdf:
-            pages = []
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    pages.append(text)
-            return "\n\n".join(pages)
+        return "\n\n".join(text for text, _ in iter_pages(path) if text)
     except Exception:
         return ""
@@ -1,11 +1,22 @@
-"""3-tier extraction pipeline: pdfplumber text -> OCR -> AI."""
+"""3-tier extraction pipeline: pdfplumber text -> OCR -> AI.
+
+Tiers are chosen per page: pages whose text layer is missing or unusable
+(scans, broken font encodings) are OCR'd, the rest keep their text layer, and
+the two are merged in page order. AI extraction is the fallback for documents
+that yield no text, or text no parser can read.
+"""
 
 from __future__ import annotations
 
+import logging
+from collections.abc import Iterable, Iterator
+from contextlib import closing
 from datetime import date, datetime
 from decimal import Decimal
 from pathlib import Path
 
+from gnomon_expenses.config import OCR_WORKERS
+from gnomon_expenses.extraction.dispatch import ParserDispatch
 from gnomon_expenses.extraction.parsers.anomaly import AnomalyParser
 from gnomon_expenses.extraction.parsers.anthropic import AnthropicParser
 from gnomon_expenses.extraction.parsers.base import ParseResult, VendorParser
@@ -15,14 +26,17 @@ from gnomon_expenses.extraction.parsers.hetzner import HetznerParser
 from gnomon_expenses.extraction.parsers.infomaniak import InfomaniakParser
 from gnomon_expenses.extraction.parsers.namecheap import NamecheapParser
 from gnomon_expenses.extraction.parsers.twilio import TwilioParser
-from gnomon_expenses.extraction.pdf_text import extract_text
+from gnomon_expenses.extraction.pdf_text import BACKEND_VERSION, is_deficient, iter_pages
+from gnomon_expenses.extraction.text_cache import cached_page_texts, cached_pages
+from gnomon_expenses.hash_cache import cached_file_hash
 from gnomon_expenses.models.expense import (
     Expense,
     ExtractionMethod,
     ExpenseStatus,
-    file_hash,
 )
 
+log = logging.getLogger(__name__)
+
 # Ordered list of parsers — specific vendors first, generic last
 PARSERS: list[VendorParser] = [
     AnomalyParser(),
@@ -36,45 +50,140 @@ PARSERS: list[VendorParser] = [
 ]
 
 
+_DISPATCH = ParserDispatch(PARSERS)
+
+# Pages read one at a time, re-parsing after each, hoping to stop early; a
+# document still incomplete after these is read to the end and parsed once
+EARLY_STOP_PAGES = 4
+
+
 def _parse_text(text: str) -> tuple[ParseResult | None, VendorParser | None]:
-    """Try each parser in order until one succeeds."""
-    for parser in PARSERS:
-        if parser.can_parse(text):
-            result = parser.parse(text)
-            if result and result.amount_gross > 0:
-                return result, parser
+    """Try each candidate parser in priority order until one succeeds."""
+    for parser in _DISPATCH.candidates(text):
+        result = parser.parse(text)
+        if result and result.amount_gross > 0:
+            return result, parser
     return None, None
 
 
-def process_pdf(path: str | Path) -> Expense | None:
-    """Run the extraction pipeline on a single PDF. Returns an Expense or None."""
-    path = Path(path)
-    fhash = file_hash(path)
+def _parse_pages(pages: Iterable[str]) -> tuple[list[str], ParseResult | None, VendorParser | None]:
+    """Parse the text read so far after each page; stop once nothing required is missing.
+
+    Returns the non-empty page texts read, and the parse of them. Re-parsing
+    after each page only happens over the first EARLY_STOP_PAGES pages, and
+    only while the parser recognizing them can stop early at all; otherwise
+    the rest is read and parsed once, so the result is that of the full text
+    and the regex work stays linear in the document length.
+    """
+    parts: list[str] = []
+    result = parser = None
+    early = True
+    for page in pages:
+        if not page:
+            continue
+        parts.append(page)
+        if not early:
+            continue
+        result, parser = _parse_text("\n\n".join(parts))
+        if parser is not None and not parser.missing(result):
+            return parts, result, parser
+        early = len(parts) < EARLY_STOP_PAGES and (parser is None or parser.stops_early)
+    if not early:
+        result, parser = _parse_text("\n\n".join(parts))
+    return parts, result, parser
+
+
+def _ocr_backend() -> str | None:
+    """Version of the OCR backend, or None if OCR is not installed."""
+    try:
+        from gnomon_expenses.extraction.ocr import backend_version
+        return backend_version()
+    except Exception:
+        return None
+
+
+def _pages(path: Path, fhash: str, methods: list[ExtractionMethod]) -> Iterator[str]:
+    """Page texts in page order: the text layer where it is usable, OCR for the rest.
+
+    Runs of deficient pages are OCR'd together, up to OCR_WORKERS in parallel.
+    The tier that produced each page yielded is appended to `methods`.
+    """
+    ocr_version: str | None = None
+    batch: list[tuple[int, str]] = []  # deficient pages awaiting OCR: (number, text layer)
 
-    # Tier 1: pdfplumber text extraction
-    text = extract_text(path)
-    extraction_method = ExtractionMethod.PDF_TEXT
+    def flush() -> Iterator[str]:
+        from gnomon_expenses.extraction.ocr import ocr_pages
 
-    if not text.strip():
-        # Tier 2: OCR fallback
+        numbers = [n for n, _ in batch]
         try:
-            from gnomon_expenses.extraction.ocr import extract_text_ocr
-            text = extract_text_ocr(path)
-            extraction_method = ExtractionMethod.OCR
-        except (ImportError, Exception):
-            pass
+            texts = cached_page_texts(fhash, ExtractionMethod.OCR.value, ocr_version, numbers,
+                                      lambda missing: ocr_pages(path, missing))
+        except Exception:
+            texts = None
+        for i, (_, layer) in enumerate(batch):
+            # A page OCR could not read keeps whatever its text layer had
+            if texts is not None:
+                methods.append(ExtractionMethod.OCR)
+                yield texts[i]
+            else:
+                methods.append(ExtractionMethod.PDF_TEXT)
+                yield layer
+        batch.clear()
+
+    with closing(cached_pages(fhash, ExtractionMethod.PDF_TEXT.value, BACKEND_VERSION,
+                              lambda start: iter_pages(path, start))) as layer:
+        for number, (text, coverage) in enumerate(layer, 1):
+            if is_deficient(text, coverage):
+                if ocr_version is None:
+                    ocr_version = _ocr_backend() or ""
+                if ocr_version:
+                    batch.append((number, text))
+                    if len(batch) >= OCR_WORKERS:
+                        yield from flush()
+                    continue
+            if batch:
+                yield from flush()
+            methods.append(ExtractionMethod.PDF_TEXT)
+            yield text
+        if batch:
+            yield from flush()
+
+
+def _tagged(pages: Iterable[str], methods: list[ExtractionMethod],
+            method: ExtractionMethod) -> Iterator[str]:
+    for page in pages:
+        methods.append(method)
+        yield page
 
-    if not text.strip():
-        # Tier 3: AI extraction
+
+def extract_local(path: Path, fhash: str) -> tuple[Expense | None, list[str] | None]:
+    """Tiers 1 and 2 only. Returns (expense, ai_pages).
+
+    ai_pages is None unless the document needs Tier 3 -- no page yielded text,
+    or no parser could read it -- and is then the page texts there are, if any.
+    """
+    # Text layer, OCR for deficient pages, until the parse is complete
+    page_methods: list[ExtractionMethod] = []
+    try:
+        with closing(_pages(path, fhash, page_methods)) as pages:
+            parts, result, parser = _parse_pages(pages)
+    except Exception:
+        # pdfplumber cannot read the file at all: OCR every page
+        page_methods.clear()
+        parts, result, parser = [], None, None
         try:
-            from gnomon_expenses.extraction.ai_extract import extract_with_ai
-            return extract_with_ai(path, fhash)
-        except (ImportError, Exception):
-            return None
+            from gnomon_expenses.extraction.ocr import backend_version, iter_pages_ocr
+            with closing(cached_pages(fhash, ExtractionMethod.OCR.value, backend_version(),
+                                      lambda start: iter_pages_ocr(path, start))) as pages:
+                parts, result, parser = _parse_pages(
+                    _tagged(pages, page_methods, ExtractionMethod.OCR))
+        except Exception:  # no OCR backend installed, or it failed too
+            page_methods.clear()
+    extraction_method = (ExtractionMethod.OCR if ExtractionMethod.OCR in page_methods
+                         else ExtractionMethod.PDF_TEXT)
 
-    result, parser = _parse_text(text)
-    if result is None:
-        return None
+    if result is None or not any(p.strip() for p in parts):
+        return None, parts
 
     expense_date = None
     if result.date:
@@ -102,10 +211,31 @@ def process_pdf(path: str | Path) -> Expense | None:
         category_account=result.category_account,
         category_name=result.category_name,
         extraction_method=extraction_method,
+        page_methods=page_methods,
         extraction_confidence=result.confidence,
         status=(
             ExpenseStatus.PROCESSED
             if result.confidence >= 0.7
             else ExpenseStatus.NEEDS_REVIEW
         ),
-    )
+    ), None
+
+
+def process_pdf(path: str | Path, fhash: str | None = None) -> Expense | None:
+    """Run the extraction pipeline on a single PDF. Returns an Expense or None.
+
+    Pass `fhash` when the caller has already hashed the file.
+    """
+    path = Path(path)
+    fhash = fhash or cached_file_hash(path)
+    expense, ai_pages = extract_local(path, fhash)
+    if ai_pages is None:
+        return expense
+
+    # Tier 3: AI extraction, on the shared rate-limited client
+    try:
+        from gnomon_expenses.extraction.ai_extract import extract_with_ai
+        return extract_with_ai(path, fhash, ai_pages)
+    except Exception as exc:
+        log.warning("AI extraction failed for %s: %s", path.name, exc)
+        return None
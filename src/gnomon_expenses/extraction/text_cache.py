@@ -0,0 +1,62 @@
+"""Cache of extracted document text, keyed by file hash and extraction method.
+
+Entries record the backend version that produced them; a different pdfplumber
+or Tesseract version counts as a miss, so upgrades re-extract automatically.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from typing import Callable
+
+from gnomon_expenses.cache import DiskCache
+from gnomon_expenses.config import TEXT_CACHE_MAX_MB
+
+_cache = DiskCache("text", TEXT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def cached_pages(fhash: str, method: str, version: str,
+                 pages_from: Callable[[int], Iterator[str]]) -> Iterator[str]:
+    """Yield page texts: cached ones first, then `pages_from(n)` for the rest.
+
+    A caller that stops early leaves the document partly read; the pages seen
+    so far are stored on close, marked incomplete, and a later call resumes
+    extraction after them. Close the generator (e.g. `contextlib.closing`).
+    """
+    key = f"{fhash}-{method}-pages"
+    entry = _cache.get_json(key)
+    if not entry or entry.get("version") != version:
+        entry = {"method": method, "version": version, "pages": [], "complete": False}
+    pages: list[str] = entry["pages"]
+    stored, complete = len(pages), entry["complete"]
+    try:
+        yield from list(pages)
+        if complete:
+            return
+        for text in pages_from(len(pages)):
+            pages.append(text)
+            yield text
+        complete = True
+    finally:
+        if len(pages) > stored or complete != entry["complete"]:
+            entry["complete"] = complete
+            _cache.put_json(key, entry)
+
+
+def cached_page_texts(fhash: str, method: str, version: str, numbers: list[int],
+                      extract: Callable[[list[int]], Iterable[str]]) -> list[str]:
+    """Texts of the given pages (1-based), calling `extract` only for those not cached.
+
+    Each page is its own entry, for tiers that only read some of a document's pages.
+    """
+    texts: dict[int, str] = {}
+    for n in numbers:
+        entry = _cache.get_json(f"{fhash}-{method}-p{n}")
+        if entry and entry.get("version") == version:
+            texts[n] = entry["text"]
+    missing = [n for n in numbers if n not in texts]
+    if missing:
+        for n, text in zip(missing, extract(missing)):
+            _cache.put_json(f"{fhash}-{method}-p{n}", {"method": method, "version": version, "text": text})
+            texts[n] = text
+    return [texts[n] for n in numbers]
@@ -0,0 +1,111 @@
+"""File hashes remembered by (device, inode, size, mtime_ns), across runs.
+
+Re-scanning an archive then costs a stat() per file instead of reading it.
+A file that is rewritten gets a new mtime (and usually size), so its stale
+entry simply stops matching. Renames and moves within a filesystem keep the
+inode, so filing a document into its month folder keeps its entry too.
+Stored as one JSON file under DATA_DIR/cache, trimmed to the newest
+HASH_CACHE_ENTRIES entries on save.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+
+from gnomon_expenses.config import CACHE_DIR, HASH_CACHE_ENTRIES
+from gnomon_expenses.models.expense import file_hash
+
+
+def stamp(st: os.stat_result) -> str:
+    """Cache key for a file's stat result."""
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def hash_stamped(path: str | Path) -> tuple[str, str | None]:
+    """Hash a file. Returns (hash, stamp), stamp None if it changed while being read."""
+    before = os.stat(path)
+    fhash = file_hash(path)
+    after = os.stat(path)
+    key = stamp(before)
+    return fhash, key if stamp(after) == key else None
+
+
+class HashCache:
+    def __init__(self, path: Path | None = None, max_entries: int = HASH_CACHE_ENTRIES) -> None:
+        self.path = path or CACHE_DIR / "hashes.json"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._new: dict[str, str] = {}
+        self._entries = self._read() if self.enabled else {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _read(self) -> dict[str, str]:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, st: os.stat_result) -> str | None:
+        with self._lock:
+            return self._entries.get(stamp(st))
+
+    def put(self, key: str, fhash: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._entries.get(key) != fhash:
+                self._entries[key] = self._new[key] = fhash
+
+    def hash(self, path: str | Path, st: os.stat_result | None = None) -> str:
+        """Hash of `path`, read from the file only on a cache miss."""
+        fhash = self.get(st or os.stat(path))
+        if fhash is None:
+            fhash, key = hash_stamped(path)
+            if key is not None:
+                self.put(key, fhash)
+        return fhash
+
+    def save(self) -> None:
+        """Merge new entries into the file (other processes may have written it)."""
+        with self._lock:
+            if not self._new:
+                return
+            new, self._new = self._new, {}
+        entries = self._read()
+        for key in new:
+            entries.pop(key, None)
+        entries.update(new)  # newest last
+        if len(entries) > self.max_entries:
+            entries = dict(list(entries.items())[-self.max_entries:])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entries, separators=(",", ":")))
+        os.replace(tmp, self.path)
+        with self._lock:
+            self._entries = {**entries, **self._entries}
+
+
+_cache: HashCache | None = None
+_cache_lock = threading.Lock()
+
+
+def hash_cache() -> HashCache:
+    """The process-wide cache, saved at exit."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HashCache()
+            atexit.register(_cache.save)
+        return _cache
+
+
+def cached_file_hash(path: str | Path, st: os.stat_result | None = None) -> str:
+    return hash_cache().hash(path, st)
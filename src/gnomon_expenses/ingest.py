@@ -0,0 +1,523 @@
+"""Staged ingestion: discover -> hash -> dedup -> extract -> ai -> file -> persist.
+
+Each stage has its own bounded queue and its own workers: threads for the
+hashing I/O, a process pool behind the extract stage (pdfplumber, OCR and the
+rule parsers), and one dispatcher keeping up to AI_CONCURRENCY Tier 3
+requests in flight on the shared asyncio client. A full queue blocks the
+stage feeding it, so a slow stage throttles the ones before it -- down to
+the caller discovering files -- without unbounded buffering in between.
+
+Documents leave the threaded stages in any order. Dedup and file are ordered
+stages: each takes documents in the order they were submitted, holding back
+any that overtook an earlier one, so which of two identical files is kept,
+the filing, the ledger and `on_done` all follow discovery order. A document
+that is skipped or fails on the way still travels down the chain to keep its
+place in line.
+
+`process` feeds it from the scanner and the watcher from its settler; both
+get each document back through `on_done` once it is saved, skipped or failed.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from gnomon_expenses.config import AI_CONCURRENCY, INGEST_HASH_THREADS, INGEST_QUEUE
+from gnomon_expenses.extraction.parallel import StageStats, extract_task, init_worker, make_pool, run_isolated
+from gnomon_expenses.hash_cache import hash_cache, hash_stamped
+
+if TYPE_CHECKING:
+    from gnomon_expenses.manifest import Manifest
+    from gnomon_expenses.models.expense import Expense
+    from gnomon_expenses.storage.adapter import StorageAdapter
+
+# Most documents saved per storage write. While more are in flight the
+# persist stage waits up to WRITE_LINGER to fill a batch; when idle it saves at once.
+WRITE_BATCH = 50
+WRITE_LINGER = 0.2
+
+_DONE = object()
+
+
+def file_into_month_folder(pdf: Path, expense: Expense, base_dir: Path) -> Path:
+    """Move a PDF into its YY-MM/ subfolder based on expense date. Returns new path."""
+    if not expense.date:
+        return pdf
+
+    folder_name = expense.date.strftime("%y-%m")  # e.g. "26-01"
+    month_dir = base_dir / folder_name
+    month_dir.mkdir(exist_ok=True)
+
+    # Already in the correct monthly folder? Keep it where it is.
+    if pdf.resolve().parent == month_dir.resolve():
+        return pdf
+
+    dest = month_dir / pdf.name
+
+    # Handle name collision (different file, same name)
+    if dest.exists():
+        stem, suffix = pdf.stem, pdf.suffix
+        i = 1
+        while dest.exists():
+            dest = month_dir / f"{stem}_{i}{suffix}"
+            i += 1
+
+    shutil.move(str(pdf), str(dest))
+    return dest
+
+
+@dataclass
+class Doc:
+    """One document on its way through the stages."""
+
+    path: Path
+    seq: int = 0  # submission order
+    fhash: str = ""
+    existing: str | None = None  # ledger id it replaces (with force)
+    expense: Expense | None = None
+    ai_pages: list[str] | None = None
+    status: str = ""  # "ok", "skip" or "fail" once done
+    error: str = ""
+    claimed: bool = False  # holds its hash in the in-flight set
+    force: bool = False  # reprocess even if the ledger has it
+    file_into: Path | None = None  # base folder of the month folders, None to leave it
+    ai_cache: bool = True
+    tag: Any = None  # the submitter's, for on_done
+
+
+class _Stage:
+    """A bounded queue drained by `workers` threads calling `handle`.
+
+    `handle` returns the stage the document goes to next, or None once it is
+    done; a done document skips the handlers of the stages after it and is
+    passed down the chain as is. When the last worker exits the next stage
+    in the chain is closed.
+    Each call counts as busy time unless `timed` is False, for handlers that
+    only wait on other processes and `record` what those reported instead.
+    """
+
+    def __init__(self, ingest: Ingest, name: str, handle: Callable[[Doc], _Stage | None],
+                 workers: int, size: int = INGEST_QUEUE, timed: bool = True) -> None:
+        self.ingest = ingest
+        self.name = name
+        self.handle = handle
+        self.timed = timed
+        self.stats = StageStats(name, queue_size=max(1, size))
+        self.next: _Stage | None = None
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, size))
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, name=f"ingest-{name}-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        self._live = len(self._threads)
+
+    def start(self) -> None:
+        for t in self._threads:
+            t.start()
+
+    def join(self) -> None:
+        for t in self._threads:
+            t.join()
+
+    def put(self, doc: Doc) -> None:
+        self.queue.put(doc)  # blocks while the stage is behind
+        self.stats.seen_depth(self.queue.qsize())
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self.queue.put(_DONE)
+
+    def record(self, seconds: float, nbytes: int = 0, items: int = 1) -> None:
+        with self._lock:
+            self.stats.add(seconds, nbytes, items)
+
+    def _run(self) -> None:
+        while (doc := self.queue.get()) is not _DONE:
+            self._step(doc)
+        self._exit()
+
+    def _step(self, doc: Doc) -> None:
+        nxt = self.next
+        if not doc.status:
+            start = time.perf_counter()
+            try:
+                nxt = self.handle(doc)
+            except Exception as exc:
+                self.ingest.finish(doc, "fail", str(exc) or type(exc).__name__)
+            if self.timed:
+                self.record(time.perf_counter() - start)
+            if doc.status:
+                nxt = self.next
+        if nxt is not None:
+            nxt.put(doc)
+
+    def _exit(self) -> None:
+        with self._lock:
+            self._live -= 1
+            last = self._live == 0
+        if last and self.next is not None:
+            self.next.close()
+
+
+class _OrderedStage(_Stage):
+    """A single-worker stage taking documents in submission order.
+
+    Documents that arrive ahead of their turn wait in `_held` until the ones
+    before them have passed. It never stops draining its queue, so the one
+    it waits for can always get through the stages before it; `_held` stays
+    bounded because Ingest.submit admits at most `queue_size` documents
+    past the oldest one not yet reported.
+    """
+
+    def __init__(self, ingest: Ingest, name: str, handle: Callable[[Doc], _Stage | None],
+                 size: int = INGEST_QUEUE) -> None:
+        super().__init__(ingest, name, handle, workers=1, size=size)
+        self._held: dict[int, Doc] = {}
+        self._turn = 0
+
+    def _run(self) -> None:
+        while (doc := self.queue.get()) is not _DONE:
+            self._held[doc.seq] = doc
+            while (doc := self._held.pop(self._turn, None)) is not None:
+                self._turn += 1
+                self._step(doc)
+        for seq in sorted(self._held):
+            self._step(self._held.pop(seq))
+        self._exit()
+
+
+class _AIStage(_Stage):
+    """Tier 3: one dispatcher keeps up to AI_CONCURRENCY requests in flight, a collector forwards results."""
+
+    def __init__(self, ingest: Ingest) -> None:
+        super().__init__(ingest, "ai", self._dispatch, workers=1)
+        self._slots = threading.Semaphore(max(1, AI_CONCURRENCY))
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._collector = threading.Thread(target=self._collect, name="ingest-ai-collect", daemon=True)
+
+    def start(self) -> None:
+        super().start()
+        self._collector.start()
+
+    def join(self) -> None:
+        super().join()
+        self._collector.join()
+
+    def _dispatch(self, doc: Doc) -> None:
+        from gnomon_expenses.extraction.ai_extract import submit_ai
+
+        self._slots.acquire()
+        start = time.perf_counter()
+        try:
+            future = submit_ai(doc.path, doc.fhash, doc.ai_pages, use_cache=doc.ai_cache)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Runs on the client's event loop: only hand over, never block there
+        future.add_done_callback(lambda f: self._results.put((doc, f, start)))
+
+    def _step(self, doc: Doc) -> None:
+        if not doc.status:
+            try:
+                self.handle(doc)
+                return
+            except Exception as exc:
+                self.ingest.finish(doc, "fail", f"AI extraction: {exc}")
+        self.ingest.file.put(doc)
+
+    def _collect(self) -> None:
+        while (item := self._results.get()) is not _DONE:
+            doc, future, start = item
+            self.record(time.perf_counter() - start)
+            try:
+                doc.expense = future.result()
+            except Exception as exc:
+                self.ingest.finish(doc, "fail", f"AI extraction: {exc}")
+            else:
+                if doc.expense is None:
+                    self.ingest.finish(doc, "fail", "could not extract data")
+            self.ingest.file.put(doc)
+            self._slots.release()
+        if self.next is not None:
+            self.next.close()
+
+    def _exit(self) -> None:
+        # Every slot back means every request has been collected
+        for _ in range(max(1, AI_CONCURRENCY)):
+            self._slots.acquire()
+        self._results.put(_DONE)
+
+
+class _PersistStage(_Stage):
+    """One writer saving documents in batches, in the order the file stage passes them."""
+
+    def __init__(self, ingest: Ingest) -> None:
+        super().__init__(ingest, "persist", lambda doc: None, workers=1)
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            doc = self.queue.get()
+            if doc is _DONE:
+                break
+            batch = [doc]
+            deadline = time.monotonic() + WRITE_LINGER
+            while len(batch) < WRITE_BATCH:
+                # Linger for more only while other documents are still on their way
+                wait = deadline - time.monotonic() if self.ingest.in_flight() > len(batch) else 0.0
+                try:
+                    doc = self.queue.get(timeout=wait) if wait > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if doc is _DONE:
+                    done = True
+                    break
+                batch.append(doc)
+            start = time.perf_counter()
+            self.ingest.save(batch)
+            self.record(time.perf_counter() - start, items=len(batch))
+        self._exit()
+
+
+class Ingest:
+    """The staged pipeline over one ledger.
+
+    `run` processes an iterable of paths and returns when all are done;
+    a long-running caller uses `start`, `submit` and `stop` instead.
+    Extraction runs in a pool of `extract_workers` processes when there is
+    more than one, or when `worker_init` is given to set them up (by default
+    they run `init_worker`); otherwise on the extract thread.
+    """
+
+    def __init__(self, storage: StorageAdapter, on_done: Callable[[Doc], None], *,
+                 force: bool = False, file_into: Path | None = None, use_ai_cache: bool = True,
+                 extract_workers: int = 1, worker_init: Callable[[], None] | None = None,
+                 queue_size: int = INGEST_QUEUE,
+                 manifest: Manifest | None = None, storage_lock: threading.Lock | None = None,
+                 after_persist: Callable[[], None] | None = None) -> None:
+        self.storage = storage
+        self.storage_lock = storage_lock or threading.Lock()
+        self._on_done = on_done
+        self._done_lock = threading.Lock()
+        self._force = force
+        self._file_into = file_into
+        self._use_ai_cache = use_ai_cache
+        self._manifest = manifest
+        self._after_persist = after_persist
+        self._cache = hash_cache()
+        self._jobs = max(1, extract_workers)
+        self._pooled = self._jobs > 1 or worker_init is not None
+        self._worker_init = worker_init or init_worker
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+        self._inflight: set[str] = set()  # hashes between dedup and done
+        self._live = 0  # documents submitted and not done yet
+        self._seq = 0  # submitted so far
+        # Reorder window: submit waits while this many documents are not reported
+        # yet, so a slow document holds up at most that many behind it
+        self._window = threading.Semaphore(max(1, queue_size))
+        self._live_lock = threading.Lock()
+        self.cache_hits = 0
+        self.counts = {"ok": 0, "skip": 0, "fail": 0}
+
+        self.hash = _Stage(self, "hash", self._hash, INGEST_HASH_THREADS, queue_size, timed=False)
+        self.dedup = _OrderedStage(self, "dedup", self._dedup, queue_size)
+        # With a pool, two threads per worker keep one task queued while another returns
+        self.extract = _Stage(self, "extract", self._extract,
+                              self._jobs * 2 if self._pooled else 1, queue_size, timed=False)
+        self.ai = _AIStage(self)
+        self.file = _OrderedStage(self, "file", self._file, queue_size)
+        self.persist = _PersistStage(self)
+        self.stages = [self.hash, self.dedup, self.extract, self.ai, self.file, self.persist]
+        for stage, nxt in zip(self.stages, self.stages[1:]):
+            stage.next = nxt
+
+    # -- driving -------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._pooled:
+            self._pool = make_pool(self._jobs, self._worker_init)
+        for stage in self.stages:
+            stage.start()
+
+    def warm(self) -> None:
+        """Start every extraction worker now instead of on first use."""
+        if self._pool is not None:
+            for future in [self._pool.submit(os.getpid) for _ in range(self._jobs)]:
+                future.result()
+
+    def submit(self, path: str | Path, *, force: bool | None = None, file_into: Path | None = None,
+               use_ai_cache: bool | None = None, tag: Any = None) -> None:
+        """Queue one file; blocks while the reorder window or the hash stage is full.
+
+        `force`, `file_into` and `use_ai_cache` override the pipeline's
+        settings for this file; `tag` comes back on its Doc.
+        """
+        doc = Doc(Path(path), force=self._force if force is None else force,
+                  file_into=file_into or self._file_into,
+                  ai_cache=self._use_ai_cache if use_ai_cache is None else use_ai_cache, tag=tag)
+        self._window.acquire()
+        with self._live_lock:
+            self._live += 1
+            doc.seq = self._seq
+            self._seq += 1
+        self.hash.put(doc)
+
+    def stop(self) -> None:
+        """Finish every document submitted so far, then shut the stages down."""
+        self.hash.close()
+        for stage in self.stages:
+            stage.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def run(self, paths: Iterable[str | Path]) -> None:
+        self.start()
+        try:
+            for path in paths:
+                self.submit(path)
+        finally:
+            self.stop()
+
+    def in_flight(self) -> int:
+        with self._live_lock:
+            return self._live
+
+    def depths(self) -> dict[str, int]:
+        """Documents waiting in each stage's queue right now."""
+        return {stage.name: stage.queue.qsize() for stage in self.stages}
+
+    def stats(self) -> list[StageStats]:
+        return [stage.stats for stage in self.stages]
+
+    def finish(self, doc: Doc, status: str, error: str = "") -> None:
+        """Mark a document done; it is reported once it reaches the persist stage."""
+        doc.status, doc.error = status, error
+        if doc.claimed:
+            with self.storage_lock:
+                self._inflight.discard(doc.fhash)
+
+    def _report(self, doc: Doc) -> None:
+        with self._done_lock:
+            self.counts[doc.status] += 1
+            try:
+                self._on_done(doc)
+            finally:
+                with self._live_lock:
+                    self._live -= 1
+                self._window.release()
+
+    # -- stages --------------------------------------------------------------
+
+    def _hash(self, doc: Doc) -> _Stage | None:
+        start = time.perf_counter()
+        try:
+            st = os.stat(doc.path)
+        except FileNotFoundError:
+            self.finish(doc, "skip", "gone")
+            return None
+        fhash = self._manifest.lookup(doc.path, st) if self._manifest else None
+        fhash = fhash or self._cache.get(st)
+        nbytes = 0
+        if fhash is None:
+            try:
+                fhash, key = hash_stamped(doc.path)
+            except OSError as exc:
+                self.finish(doc, "fail", f"could not hash: {exc}")
+                return None
+            if key is not None:
+                self._cache.put(key, fhash)
+            nbytes = st.st_size
+        else:
+            with self.hash._lock:
+                self.cache_hits += 1
+        if self._manifest is not None:
+            self._manifest.record(doc.path, fhash, st)
+        self.hash.record(time.perf_counter() - start, nbytes)
+        doc.fhash = fhash
+        return self.dedup
+
+    def _dedup(self, doc: Doc) -> _Stage | None:
+        with self.storage_lock:
+            existing = self.storage.id_for_hash(doc.fhash)
+            duplicate = (existing and not doc.force) or doc.fhash in self._inflight
+            if not duplicate:
+                self._inflight.add(doc.fhash)
+                doc.claimed = True
+        if duplicate:
+            self.finish(doc, "skip", "already processed")
+            return None
+        doc.existing = existing
+        return self.extract
+
+    def _run_extract(self, item: tuple[Path, str]) -> tuple[Expense | None, float, list[str] | None]:
+        pool = self._pool
+        if pool is None:
+            return extract_task(item)
+        try:
+            return pool.submit(extract_task, item).result()
+        except BrokenProcessPool:
+            # A worker died and took the pool with it; we can't tell which
+            # task did it. Replace the pool and re-run this item alone, so
+            # only the culprit fails.
+            with self._pool_lock:
+                if self._pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = make_pool(self._jobs, self._worker_init)
+            result, error = run_isolated(extract_task, item, self._worker_init)
+            if error is not None:
+                raise error
+            return result
+
+    def _extract(self, doc: Doc) -> _Stage | None:
+        try:
+            expense, seconds, ai_pages = self._run_extract((doc.path, doc.fhash))
+        except Exception as exc:
+            self.finish(doc, "fail", f"worker error: {exc}")
+            return None
+        self.extract.record(seconds)
+        if ai_pages is not None:
+            doc.ai_pages = ai_pages
+            return self.ai
+        if expense is None:
+            self.finish(doc, "fail", "could not extract data")
+            return None
+        doc.expense = expense
+        return self.file
+
+    def _file(self, doc: Doc) -> _Stage | None:
+        expense = doc.expense
+        if doc.existing:
+            expense.id = doc.existing
+        if doc.file_into is not None:
+            new_path = file_into_month_folder(doc.path, expense, doc.file_into)
+            expense.file_path = str(new_path)
+            if self._manifest is not None and new_path != doc.path:
+                self._manifest.move(doc.path, new_path)
+        return self.persist
+
+    def save(self, batch: list[Doc]) -> None:
+        """Save the documents in `batch` that are not done yet, then report them all in order."""
+        todo = [doc for doc in batch if not doc.status]
+        if todo:
+            try:
+                with self.storage_lock:
+                    self.storage.save_many(doc.expense for doc in todo)
+            except Exception as exc:
+                for doc in todo:
+                    self.finish(doc, "fail", f"could not save: {exc}")
+            else:
+                for doc in todo:
+                    self.finish(doc, "ok")
+        for doc in batch:
+            self._report(doc)
+        if self._after_persist is not None:
+            self._after_persist()
@@ -0,0 +1,114 @@
+"""Persistent (size, mtime, inode) -> file hash manifest for a directory tree.
+
+A file whose size, mtime_ns and inode all match what was recorded is taken
+to be unchanged, so its hash is reused instead of reading the file again.
+Stored as JSON under DATA_DIR/cache/manifest, one file per root directory;
+losing it only costs re-hashing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from gnomon_expenses.config import CACHE_DIR
+from gnomon_expenses.hash_cache import cached_file_hash
+
+
+class Manifest:
+    def __init__(self, root: str | Path, path: Path | None = None) -> None:
+        self.root = Path(root).resolve()
+        digest = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+        self.path = path or CACHE_DIR / "manifest" / f"{digest}.json"
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            self._files: dict[str, list] = json.loads(self.path.read_text())["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._files = {}
+
+    def _key(self, path: str | Path) -> str:
+        p = Path(os.path.abspath(path))
+        try:
+            return str(p.relative_to(self.root))
+        except ValueError:
+            return str(p)
+
+    @staticmethod
+    def _stamp(st: os.stat_result) -> list:
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def lookup(self, path: str | Path, st: os.stat_result | None = None) -> str | None:
+        """Recorded hash of `path`, if the file is unchanged since it was recorded."""
+        with self._lock:
+            entry = self._files.get(self._key(path))
+        if entry is None:
+            return None
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return None
+        return entry[3] if entry[:3] == self._stamp(st) else None
+
+    def hash_of(self, path: str | Path, st: os.stat_result | None = None) -> str:
+        """Hash of `path`, read from the file only if it is new or changed."""
+        st = st or os.stat(path)
+        fhash = self.lookup(path, st)
+        if fhash is None:
+            fhash = cached_file_hash(path, st)
+            self.record(path, fhash, st)
+        return fhash
+
+    def record(self, path: str | Path, fhash: str, st: os.stat_result | None = None) -> None:
+        st = st or os.stat(path)
+        with self._lock:
+            self._files[self._key(path)] = [*self._stamp(st), fhash]
+            self._dirty = True
+
+    def forget(self, path: str | Path) -> None:
+        with self._lock:
+            if self._files.pop(self._key(path), None) is not None:
+                self._dirty = True
+
+    def move(self, src: str | Path, dst: str | Path) -> None:
+        """Carry the hash over to the file's new path (a rename keeps the content)."""
+        with self._lock:
+            entry = self._files.pop(self._key(src), None)
+            self._dirty = True
+        if entry is not None:
+            try:
+                self.record(dst, entry[3])
+            except OSError:
+                pass
+
+    def prune(self, seen: set[str], under: str | Path | None = None, recursive: bool = True) -> None:
+        """Drop entries in `under` (default: the root) for paths not in `seen`.
+
+        With `recursive` False only files directly in `under` are considered.
+        """
+        keep = {self._key(p) for p in seen}
+        prefix = self._key(under if under is not None else self.root)
+        prefix = "" if prefix == "." else prefix + os.sep
+        with self._lock:
+            for key in list(self._files):
+                rest = key[len(prefix):]
+                if not key.startswith(prefix) or (not recursive and os.sep in rest):
+                    continue
+                if key not in keep:
+                    del self._files[key]
+                    self._dirty = True
+
+    def save(self) -> None:
+        """Write the manifest if it changed (atomically)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"root": str(self.root), "files": self._files})
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(data)
+        os.replace(tmp, self.path)
@@ -6,9 +6,9 @@ import uuid
 from decimal import Decimal
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class ExtractionMethod(str, Enum):
@@ -48,18 +48,80 @@ class Expense(BaseModel):
     labels: list[str] = Field(default_factory=list)
     notes: str = ""
     context_files: list[str] = Field(default_factory=list)
-    extraction_method: ExtractionMethod = ExtractionMethod.PDF_TEXT
+    extraction_method: ExtractionMethod = ExtractionMethod.PDF_TEXT  # OCR if any page needed it
+    # Tier that produced each page read, in page order
+    page_methods: list[ExtractionMethod] = Field(default_factory=list)
     extraction_confidence: float = 1.0
+    # Tier 3 only: payload strategy sent, request size and API latency
+    ai_payload: str = ""
+    ai_request_bytes: Optional[int] = None
+    ai_latency_ms: Optional[int] = None
     processed_at: _dt.datetime = Field(default_factory=_dt.datetime.now)
     status: ExpenseStatus = ExpenseStatus.PROCESSED
 
     model_config = {"json_encoders": {Decimal: str, _dt.date: str, _dt.datetime: str}}
 
 
+# Validates a whole JSON array of records in one call, instead of one
+# model_validate per record
+EXPENSE_LIST = TypeAdapter(list[Expense])
+
+
+def _decimal(value: Any) -> Decimal:
+    return Decimal(str(value))
+
+
+# How ExpenseView converts stored JSON values; other fields are used as stored
+_VIEW_TYPES = {
+    "date": _dt.date.fromisoformat,
+    "processed_at": _dt.datetime.fromisoformat,
+    "amount_gross": _decimal,
+    "amount_net": _decimal,
+    "vat_rate": _decimal,
+    "vat_amount": _decimal,
+    "status": ExpenseStatus,
+    "extraction_method": ExtractionMethod,
+    "page_methods": lambda methods: [ExtractionMethod(m) for m in methods],
+}
+
+
+class ExpenseView:
+    """Read-only view of a stored expense record, for reports and listings.
+
+    Fields are converted from the JSON record when read, with the same types
+    as on Expense, but nothing is validated and no model is built. Only for
+    records this tool wrote.
+    """
+
+    __slots__ = ("record",)
+
+    def __init__(self, record: dict) -> None:
+        self.record = record
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            value = self.record[name]
+        except KeyError:
+            field = Expense.model_fields.get(name)
+            if field is None:
+                raise AttributeError(name) from None
+            return field.get_default(call_default_factory=True)
+        convert = _VIEW_TYPES.get(name)
+        return convert(value) if convert is not None and value is not None else value
+
+    def to_expense(self) -> Expense:
+        return Expense.model_validate(self.record)
+
+
+_HASH_BUFFER = 1 << 20
+
+
 def file_hash(path: str | Path) -> str:
-    """SHA-256 hash of a file for deduplication."""
+    """SHA-256 hash of a file for deduplication (see hash_cache for the cached form)."""
     h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
+    buf = bytearray(_HASH_BUFFER)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(view[:n])
     return h.hexdigest()
@@ -9,33 +9,26 @@ from rich.console import Console
 from rich.table import Table
 
 from gnomon_expenses.models.categories import KMU_ACCOUNTS
-from gnomon_expenses.models.expense import Expense
+from gnomon_expenses.models.expense import ExpenseView
 from gnomon_expenses.models.vat import RATE_LABELS
-from gnomon_expenses.storage.local_json import LocalJsonStorage
+from gnomon_expenses.storage.adapter import StorageAdapter
+from gnomon_expenses.storage.factory import get_storage
 
 console = Console()
 
 
-def _filter(expenses: list[Expense], month: str | None = None,
-            currency: str | None = None) -> list[Expense]:
-    if month:
-        expenses = [e for e in expenses if e.date and e.date.strftime("%Y-%m") == month]
-    if currency:
-        expenses = [e for e in expenses if e.currency.upper() == currency.upper()]
-    return expenses
-
-
-def summary_report(month: str | None = None, currency: str | None = None) -> None:
+def summary_report(month: str | None = None, currency: str | None = None,
+                   storage: StorageAdapter | None = None) -> None:
     """Print a summary report grouped by KMU category."""
-    storage = LocalJsonStorage()
-    expenses = _filter(storage.load_all(), month, currency)
+    storage = storage or get_storage()
+    expenses = storage.view(month=month, currency=currency)
 
     if not expenses:
         console.print("[yellow]No expenses for the given filters.[/yellow]")
         return
 
     # Group by (currency, category_account)
-    by_cat: dict[str, dict[int | None, list[Expense]]] = defaultdict(lambda: defaultdict(list))
+    by_cat: dict[str, dict[int | None, list[ExpenseView]]] = defaultdict(lambda: defaultdict(list))
     for e in expenses:
         by_cat[e.currency][e.category_account].append(e)
 
@@ -82,17 +75,17 @@ def summary_report(month: str | None = None, currency: str | None = None) -> Non
         console.print()
 
 
-def vat_report(month: str | None = None) -> None:
+def vat_report(month: str | None = None, storage: StorageAdapter | None = None) -> None:
     """Print a MWST/VAT report for tax filing."""
-    storage = LocalJsonStorage()
-    expenses = _filter(storage.load_all(), month)
+    storage = storage or get_storage()
+    expenses = storage.view(month=month)
 
     if not expenses:
         console.print("[yellow]No expenses for the given filters.[/yellow]")
         return
 
     # Group by (currency, vat_rate)
-    by_rate: dict[str, dict[Decimal, list[Expense]]] = defaultdict(lambda: defaultdict(list))
+    by_rate: dict[str, dict[Decimal, list[ExpenseView]]] = defaultdict(lambda: defaultdict(list))
     for e in expenses:
         by_rate[e.currency][e.vat_rate].append(e)
 
@@ -0,0 +1,129 @@
+"""Incremental directory scanner: streams supported files as it finds them.
+
+Walks with os.scandir, one directory at a time, yielding each directory's
+files (sorted by name) before descending, so the caller can start on the
+first files while the rest of the tree is still being listed.
+
+A directory's mtime changes when an entry is added, removed or renamed in
+it -- not when a file in it is rewritten in place, and not when anything
+deeper changes. With a ScanState, each directory's mtime and subdirectories
+are recorded when a run completes; next time a directory whose mtime is
+unchanged is not listed again, only its recorded subdirectories are
+visited. A file rewritten in place inside such a directory needs a full
+scan to be seen again. Month folders (YY-MM/) directly under the root can
+also be treated as sealed and skipped outright.
+
+The recorded state belongs to the ledger the scanned files went into: it is
+dropped when that ledger is gone, recreated, or another backend is in use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from gnomon_expenses.config import CACHE_DIR, SUPPORTED_EXTENSIONS
+
+MONTH_FOLDER = re.compile(r"\d\d-\d\d")
+
+
+class ScanState:
+    """Directory mtimes and subdirectories seen by the last completed scan of one root."""
+
+    def __init__(self, root: str | Path, path: Path | None = None, fresh: bool = False,
+                 ledger: str | None = None) -> None:
+        """`fresh` ignores what was recorded, so every directory is listed (and recorded anew).
+
+        So does a `ledger` identity (see `ledger_identity()`) that is None or
+        differs from the one recorded with the state.
+        """
+        self.root = Path(root).resolve()
+        self._base = os.path.abspath(root)  # scan() paths are joined onto the root as given
+        digest = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+        self.path = path or CACHE_DIR / "scan" / f"{digest}.json"
+        self._dirs: dict[str, list] = {}
+        if not fresh and ledger is not None:
+            try:
+                recorded = json.loads(self.path.read_text())
+                if recorded["ledger"] == ledger:
+                    self._dirs = recorded["dirs"]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        self._seen: dict[str, list] = {}
+
+    def _key(self, path: str | Path) -> str:
+        return os.path.relpath(os.path.abspath(path), self._base)
+
+    def known(self, key: str, mtime_ns: int) -> list[str] | None:
+        """Subdirectories of an unchanged directory, or None if it must be listed."""
+        entry = self._dirs.get(key)
+        return entry[1] if entry is not None and entry[0] == mtime_ns else None
+
+    def visited(self, key: str, mtime_ns: int, subdirs: list[str]) -> None:
+        self._seen[key] = [mtime_ns, subdirs]
+
+    def commit(self, failed: Iterable[str | Path] = (), ledger: str | None = None) -> None:
+        """Record this scan against `ledger`, the identity of the ledger it was saved to.
+
+        Directories holding a file that failed are listed again next time.
+        """
+        retry = {self._key(Path(p).parent) for p in failed}
+        dirs = {k: v for k, v in self._seen.items() if k not in retry}
+        # Keep directories this scan did not go into (sealed, or not recursive)
+        # as long as their parent still has them
+        for key, entry in self._dirs.items():
+            parent = self._seen.get(os.path.dirname(key) or ".")
+            if key not in self._seen and key != "." and (parent is None or os.path.basename(key) in parent[1]):
+                dirs[key] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"root": str(self.root), "ledger": ledger, "dirs": dirs}))
+        os.replace(tmp, self.path)
+
+
+def scan(directory: str | Path, recursive: bool = False, state: ScanState | None = None,
+         sealed: bool = False) -> Iterator[os.DirEntry]:
+    """Supported files under `directory`, streamed directory by directory.
+
+    With `state`, directories unchanged since the last committed scan are
+    skipped. With `sealed`, so are the YY-MM/ folders directly inside it.
+    """
+    stack = [(os.fspath(directory), ".")]
+    while stack:
+        path, key = stack.pop()
+        try:
+            # stat before listing: an entry added meanwhile changes the mtime recorded
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        subdirs = state.known(key, mtime_ns) if state is not None else None
+        if subdirs is None:
+            files: list[os.DirEntry] = []
+            subdirs = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                            elif (os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+                                  and entry.is_file()):
+                                files.append(entry)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            subdirs.sort()
+            yield from sorted(files, key=lambda e: e.name)
+        if state is not None:
+            state.visited(key, mtime_ns, subdirs)
+        if not recursive:
+            continue
+        for name in reversed(subdirs):
+            if sealed and key == "." and MONTH_FOLDER.fullmatch(name):
+                continue
+            stack.append((os.path.join(path, name), os.path.normpath(os.path.join(key, name))))
@@ -0,0 +1,64 @@
+"""Client side of `gnomon-expenses serve`: JSON over HTTP on a Unix socket."""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any
+
+from gnomon_expenses.config import SERVE_SOCKET
+
+
+class ServerError(RuntimeError):
+    """The daemon answered with an error."""
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: Path, timeout: float | None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(str(self._path))
+        self.sock = sock
+
+
+def server_running(path: Path = SERVE_SOCKET) -> bool:
+    """Whether a daemon is listening on `path` (a stale socket file is not enough)."""
+    if not os.path.exists(path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(1.0)
+        sock.connect(str(path))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def request(method: str, url: str, body: Any = None, timeout: float | None = 60.0,
+            path: Path = SERVE_SOCKET) -> Any:
+    """Call the daemon. Returns the decoded response, None on 404; raises ServerError otherwise."""
+    conn = _UnixConnection(path, timeout)
+    try:
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        conn.request(method, url, body=data, headers=headers)
+        resp = conn.getresponse()
+        payload = resp.read()
+    finally:
+        conn.close()
+    result = json.loads(payload) if payload else None
+    if resp.status == 404:
+        return None
+    if resp.status >= 400:
+        message = result.get("error") if isinstance(result, dict) else None
+        raise ServerError(message or f"{method} {url}: HTTP {resp.status}")
+    return result
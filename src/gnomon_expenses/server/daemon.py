@@ -0,0 +1,468 @@
+"""`gnomon-expenses serve`: one long-running process with everything warm.
+
+Parsers and PDF backends are imported once in a pool of worker processes,
+the Tier 3 client keeps its connections, and the ledger is loaded into memory
+once and written behind in batches. Submitted documents go through one
+long-running ingest pipeline (ingest.Ingest) over that ledger, so a document
+costs its extraction and nothing else. While it runs, the CLI routes its commands here
+(see cli._get_storage); it reloads the ledger when another process (the
+watcher, or the CLI with --local) writes it.
+
+JSON over HTTP on a Unix socket (SERVE_SOCKET):
+
+    GET    /status                  pid, uptime, ledger size, documents handled
+    POST   /submit                  {"paths": [...], "force": false, "file_into": dir or null,
+                                     "ai_cache": true} -> one result per path
+    GET    /expenses[?hash=H]       all records, or those with this file hash
+    GET    /expenses?month=...      records matching the filters of storage.query.Query
+                                    (month, from, to, vendor, label, currency, status,
+                                    account, limit, order_by)
+    GET    /ids?hash=H              id of the record with this file hash
+    GET    /expenses/<id prefix>    one record
+    POST   /expenses                upsert a list of records
+    PUT    /expenses                replace all records
+    PUT    /expenses/<id>           upsert one record
+    DELETE /expenses/<id prefix>    delete
+    POST   /sync, /compact          as the CLI commands
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import signal
+import socketserver
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from rich.console import Console
+
+from gnomon_expenses.config import (
+    ANTHROPIC_API_KEY,
+    LEDGER_PATH,
+    SERVE_SOCKET,
+    SERVE_WORKERS,
+    SQLITE_PATH,
+)
+from gnomon_expenses.models.expense import EXPENSE_LIST, Expense
+from gnomon_expenses.server.client import server_running
+from gnomon_expenses.storage.adapter import StorageAdapter
+from gnomon_expenses.storage.factory import get_storage
+from gnomon_expenses.storage.query import Query
+
+if TYPE_CHECKING:
+    from gnomon_expenses.ingest import Doc
+
+log = logging.getLogger(__name__)
+console = Console()
+
+# Files whose change means another process wrote the ledger
+_LEDGER_FILES = (
+    LEDGER_PATH,
+    LEDGER_PATH.with_name(LEDGER_PATH.name + ".journal"),
+    SQLITE_PATH,
+    SQLITE_PATH.with_name(SQLITE_PATH.name + "-wal"),
+)
+
+# The writer waits this long after a change so bursts are saved together
+WRITE_LINGER = 0.2
+
+
+def _dump(expense: Expense) -> dict:
+    return json.loads(expense.model_dump_json())
+
+
+def _ledger_stamp() -> tuple:
+    stamp = []
+    for path in _LEDGER_FILES:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp.append((path.name, st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+
+class _Ledger(StorageAdapter):
+    """The ledger as JSON records in memory, written behind by one thread.
+
+    Also a StorageAdapter, for the ingest pipeline to dedup against and save to.
+    """
+
+    def __init__(self, storage: StorageAdapter) -> None:
+        self._storage = storage
+        self._lock = threading.Condition()
+        self._io = threading.Lock()  # one storage write at a time
+        self._records: dict[str, dict] = {}
+        self._by_hash: dict[str, str] = {}
+        self._dirty: dict[str, dict | None] = {}  # id -> record to write, None to delete
+        self._writing: dict[str, dict | None] = {}  # taken by the writer, not on disk yet
+        self._stamp: tuple = ()
+        self._stopped = False
+        self._writer = threading.Thread(target=self._write_loop, name="serve-writer", daemon=True)
+        with self._lock:
+            self._load()
+
+    def start(self) -> None:
+        self._writer.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            self._lock.notify()
+        self._writer.join()
+        self.flush()
+        with self._io:
+            self._storage.flush()
+
+    def _load(self) -> None:
+        stamp = _ledger_stamp()  # before reading: a write meanwhile triggers another reload
+        self._records = {r["id"]: r for r in self._storage.records()}
+        for changes in (self._writing, self._dirty):
+            for eid, record in changes.items():
+                if record is None:
+                    self._records.pop(eid, None)
+                else:
+                    self._records[eid] = record
+        self._by_hash = {}
+        for eid, record in self._records.items():
+            self._by_hash.setdefault(record.get("file_hash", ""), eid)
+        self._stamp = stamp
+
+    def _fresh(self) -> None:
+        if not self._writing and _ledger_stamp() != self._stamp:
+            self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            self._fresh()
+            return list(self._records.values())
+
+    def select(self, q: Query) -> list[dict]:
+        with self._lock:
+            self._fresh()
+            records = list(self._records.values())
+        return q.apply(records)
+
+    def find(self, prefix: str) -> dict | None:
+        with self._lock:
+            self._fresh()
+            record = self._records.get(prefix)
+            if record is not None:
+                return record
+            return next((r for eid, r in self._records.items() if eid.startswith(prefix)), None)
+
+    def id_for_hash(self, file_hash: str) -> str | None:
+        with self._lock:
+            self._fresh()
+            return self._by_hash.get(file_hash)
+
+    def put(self, records: list[dict]) -> None:
+        with self._lock:
+            self._fresh()
+            for record in records:
+                eid = record["id"]
+                old = self._records.get(eid)
+                if old is not None and self._by_hash.get(old.get("file_hash", "")) == eid:
+                    del self._by_hash[old["file_hash"]]
+                self._records[eid] = self._dirty[eid] = record
+                self._by_hash.setdefault(record.get("file_hash", ""), eid)
+            self._lock.notify()
+
+    def delete(self, prefix: str) -> bool:
+        with self._lock:
+            self._fresh()
+            ids = [eid for eid in self._records if eid.startswith(prefix)]
+            for eid in ids:
+                record = self._records.pop(eid)
+                if self._by_hash.get(record.get("file_hash", "")) == eid:
+                    del self._by_hash[record["file_hash"]]
+                self._dirty[eid] = None
+            self._lock.notify()
+            return bool(ids)
+
+    def replace(self, expenses: list[Expense]) -> None:
+        with self._io:
+            with self._lock:
+                self._dirty.clear()
+            self._storage.save_all(expenses)
+            with self._lock:
+                self._load()
+
+    def exclusive(self, fn: Any) -> Any:
+        """Run a storage operation (sync, compact) on the flushed ledger, then reload."""
+        self.flush()
+        with self._io:
+            result = fn(self._storage)
+            with self._lock:
+                self._load()
+        return result
+
+    # -- StorageAdapter ------------------------------------------------------
+
+    def load_all(self) -> list[Expense]:
+        return EXPENSE_LIST.validate_python(self.records())
+
+    def _select(self, q: Query) -> list[dict]:
+        return self.select(q)
+
+    def save(self, expense: Expense) -> None:
+        self.put([_dump(expense)])
+
+    def save_many(self, expenses: Iterable[Expense]) -> None:
+        self.put([_dump(expense) for expense in expenses])
+
+    def save_all(self, expenses: list[Expense]) -> None:
+        self.replace(expenses)
+
+    def find_by_id(self, expense_id: str) -> Expense | None:
+        record = self.find(expense_id)
+        return Expense.model_validate(record) if record is not None else None
+
+    def find_by_hash(self, file_hash: str) -> Expense | None:
+        eid = self.id_for_hash(file_hash)
+        return self.find_by_id(eid) if eid else None
+
+    def flush(self) -> None:
+        with self._io:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._writing, self._dirty = self._dirty, {}
+                changes = self._writing
+            try:
+                upserts = [Expense.model_validate(r) for r in changes.values() if r is not None]
+                self._storage.save_many(upserts)
+                for eid, record in changes.items():
+                    if record is None:
+                        self._storage.delete(eid)
+            except Exception as exc:
+                log.error("could not save %d record(s): %s", len(changes), exc)
+                with self._lock:
+                    # Keep them for the next attempt, under anything newer
+                    self._dirty = {**changes, **self._dirty}
+            with self._lock:
+                self._writing = {}
+                self._stamp = _ledger_stamp()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._dirty and not self._stopped:
+                    self._lock.wait()
+                if self._stopped:
+                    return
+            time.sleep(WRITE_LINGER)
+            self.flush()
+            with self._lock:
+                idle = not self._dirty
+            if idle:
+                # Caught up: write what the backend deferred (ledger.csv)
+                with self._io:
+                    self._storage.flush()
+
+
+def _warm() -> None:
+    """Worker initializer: import the extraction pipeline once per process.
+
+    Ctrl+C reaches the whole process group; the server shuts its workers
+    down itself, so they ignore it instead of dying mid-task. A worker
+    forked after serve() installed its SIGTERM handler gets the default back.
+    """
+    from gnomon_expenses.extraction.parallel import init_worker
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    init_worker()
+    import gnomon_expenses.extraction.pipeline  # noqa: F401
+
+
+class _Pipeline:
+    """The ingest pipeline over the in-memory ledger; each request waits for its own documents."""
+
+    def __init__(self, ledger: _Ledger, workers: int) -> None:
+        from gnomon_expenses.ingest import Ingest
+
+        self.workers = max(1, workers)
+        self._ingest = Ingest(ledger, self._done, extract_workers=self.workers, worker_init=_warm)
+        self.counts = self._ingest.counts
+
+    def start(self) -> None:
+        self._ingest.start()
+        self._ingest.warm()
+        if ANTHROPIC_API_KEY:
+            from gnomon_expenses.extraction.ai_client import ai_runner
+            ai_runner()
+
+    def shutdown(self) -> None:
+        self._ingest.stop()
+
+    def _done(self, doc: Doc) -> None:
+        doc.tag.set_result(doc)
+
+    def submit(self, paths: list[str], force: bool, file_into: str | None, ai_cache: bool) -> list[dict]:
+        from gnomon_expenses.hash_cache import hash_cache
+
+        base = Path(file_into).resolve() if file_into else None
+        futures: list[Future] = []
+        for path in paths:
+            futures.append(Future())
+            self._ingest.submit(path, force=force, file_into=base, use_ai_cache=ai_cache, tag=futures[-1])
+        docs = [f.result() for f in futures]
+        hash_cache().save()
+        results = []
+        for doc in docs:
+            record = _dump(doc.expense) if doc.status == "ok" else None
+            results.append({"path": str(doc.path), "status": doc.status, "error": doc.error, "expense": record})
+            if doc.status == "ok":
+                console.print(f"  [green]  ok[/green]  {doc.path.name} — "
+                              f"{record['vendor']} {record['currency']} {record['amount_gross']}")
+            elif doc.status == "fail":
+                console.print(f"  [red]fail[/red]  {doc.path.name} ({doc.error})")
+        return results
+
+
+class _App:
+    def __init__(self, ledger: _Ledger, pipeline: _Pipeline) -> None:
+        self.ledger = ledger
+        self.pipeline = pipeline
+        self.started = time.time()
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "socket": str(SERVE_SOCKET),
+            "uptime_s": round(time.time() - self.started, 1),
+            "records": len(self.ledger),
+            "workers": self.pipeline.workers,
+            "documents": dict(self.pipeline.counts),
+        }
+
+    def handle(self, method: str, url: str, body: Any) -> tuple[int, Any]:
+        parts = urlsplit(url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        route = [unquote(p) for p in parts.path.strip("/").split("/") if p]
+        head, rest = (route[0] if route else ""), route[1:]
+
+        if method == "GET" and head == "status":
+            return 200, self.status()
+        if method == "POST" and head == "submit":
+            return 200, self.pipeline.submit(
+                list(body.get("paths", [])), bool(body.get("force")),
+                body.get("file_into"), bool(body.get("ai_cache", True)),
+            )
+        if method == "GET" and head == "ids" and "hash" in query:
+            eid = self.ledger.id_for_hash(query["hash"])
+            return (200, eid) if eid else (404, None)
+        if head == "expenses" and not rest:
+            if method == "GET":
+                if "hash" in query:
+                    eid = self.ledger.id_for_hash(query["hash"])
+                    return 200, [self.ledger.find(eid)] if eid else []
+                if query:
+                    return 200, self.ledger.select(Query.from_params(query))
+                return 200, self.ledger.records()
+            if method == "POST":
+                self.ledger.put([_dump(Expense.model_validate(r)) for r in body])
+                return 200, {"saved": len(body)}
+            if method == "PUT":
+                self.ledger.replace([Expense.model_validate(r) for r in body])
+                return 200, {"saved": len(body)}
+        if head == "expenses" and len(rest) == 1:
+            if method == "GET":
+                record = self.ledger.find(rest[0])
+                return (200, record) if record else (404, None)
+            if method == "PUT":
+                self.ledger.put([_dump(Expense.model_validate({**body, "id": rest[0]}))])
+                return 200, {"saved": 1}
+            if method == "DELETE":
+                return 200, self.ledger.delete(rest[0])
+        if method == "POST" and head == "sync":
+            self.ledger.exclusive(lambda storage: storage.export_mirrors())
+            return 200, {}
+        if method == "POST" and head == "compact":
+            self.ledger.exclusive(lambda storage: storage.compact())
+            return 200, {}
+        return 404, {"error": f"no route for {method} {parts.path}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server
+
+    def _dispatch(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, result = self.server.app.handle(self.command, self.path, body)
+        except (ValueError, TypeError, KeyError) as exc:
+            status, result = 400, {"error": str(exc)}
+        except Exception as exc:
+            log.exception("%s %s failed", self.command, self.path)
+            status, result = 500, {"error": str(exc)}
+        payload = json.dumps(result).encode() if result is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def address_string(self) -> str:
+        return "local"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        log.debug(format, *args)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    app: _App
+
+
+def _terminate(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(workers: int = SERVE_WORKERS, socket_path: Path = SERVE_SOCKET) -> None:
+    """Run the daemon until Ctrl+C or SIGTERM."""
+    if server_running(socket_path):
+        raise RuntimeError(f"a server is already listening on {socket_path}")
+    socket_path.unlink(missing_ok=True)  # stale, left by a crash
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    ledger = _Ledger(get_storage())
+    pipeline = _Pipeline(ledger, workers)
+    pipeline.start()
+    ledger.start()
+
+    old_umask = os.umask(0o077)  # the socket is for this user only
+    try:
+        server = _Server(str(socket_path), _Handler)
+    finally:
+        os.umask(old_umask)
+    server.app = _App(ledger, pipeline)
+    signal.signal(signal.SIGTERM, _terminate)
+    console.print(f"Serving on {socket_path} ({len(ledger)} expenses, {pipeline.workers} workers, "
+                  f"ready in {time.perf_counter() - started:.1f}s; Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        pipeline.shutdown()
+        ledger.stop()
@@ -1,8 +1,14 @@
 """Abstract storage adapter — swap local JSON for S3/GCS/Supabase later."""
 
+import json
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date
+from typing import Any
 
-from gnomon_expenses.models.expense import Expense
+from gnomon_expenses.models.expense import EXPENSE_LIST, Expense, ExpenseView
+from gnomon_expenses.storage.query import Query
 
 
 class StorageAdapter(ABC):
@@ -10,10 +16,44 @@ class StorageAdapter(ABC):
     def load_all(self) -> list[Expense]:
         """Load all expense records."""
 
+    def query(self, month: str | None = None, date_range: tuple[date | None, date | None] | None = None,
+              vendor: str | None = None, label: str | None = None, currency: str | None = None,
+              status: str | None = None, account: int | None = None, limit: int | None = None,
+              order_by: str | None = None) -> list[Expense]:
+        """Load the expenses matching every filter given (see storage.query.Query)."""
+        return EXPENSE_LIST.validate_python(self._select(Query(
+            month, date_range, vendor, label, currency, status, account, limit, order_by)))
+
+    def view(self, **filters: Any) -> list[ExpenseView]:
+        """Like query(), as read-only views that skip building models (for reports)."""
+        return [ExpenseView(r) for r in self._select(Query(**filters))]
+
+    def records(self) -> list[dict]:
+        """All records as stored (JSON dicts). Backends may override to skip the models."""
+        return [json.loads(e.model_dump_json()) for e in self.load_all()]
+
+    def _select(self, q: Query) -> list[dict]:
+        """The records matching a query. Backends override this to filter where the data is."""
+        return q.apply(self.records())
+
     @abstractmethod
     def save(self, expense: Expense) -> None:
         """Save or update a single expense (upsert by id)."""
 
+    def save_many(self, expenses: Iterable[Expense]) -> None:
+        """Save or update several expenses. Backends may override to write once."""
+        for expense in expenses:
+            self.save(expense)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group the saves made inside the block.
+
+        Backends that support it apply them in memory and flush once on exit;
+        the default writes through immediately.
+        """
+        yield
+
     @abstractmethod
     def save_all(self, expenses: list[Expense]) -> None:
         """Replace all records."""
@@ -26,6 +66,23 @@ class StorageAdapter(ABC):
     def find_by_hash(self, file_hash: str) -> Expense | None:
         """Find expense by file hash (dedup check)."""
 
+    def id_for_hash(self, file_hash: str) -> str | None:
+        """Id of the expense with this file hash, if any. Backends may answer from an index."""
+        expense = self.find_by_hash(file_hash)
+        return expense.id if expense else None
+
     @abstractmethod
     def delete(self, expense_id: str) -> bool:
         """Delete an expense by id."""
+
+    def export_mirrors(self) -> None:
+        """Write the monthly JSON and CSV mirrors under DATA_DIR from the current records."""
+        from gnomon_expenses.storage.local_json import write_mirrors
+
+        write_mirrors([json.loads(e.model_dump_json()) for e in self.load_all()])
+
+    def flush(self) -> None:
+        """Write out what the backend deferred (the JSON backend's ledger.csv). No-op by default."""
+
+    def compact(self) -> None:
+        """Fold write-ahead data into the main store. No-op unless the backend has any."""
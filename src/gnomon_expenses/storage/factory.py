@@ -0,0 +1,37 @@
+"""Pick the configured storage backend."""
+
+import os
+
+from gnomon_expenses.config import LEDGER_PATH, SQLITE_PATH, STORAGE_BACKEND
+from gnomon_expenses.storage.adapter import StorageAdapter
+
+
+def get_storage() -> StorageAdapter:
+    """Return the backend selected by GNOMON_STORAGE ("json" or "sqlite")."""
+    if STORAGE_BACKEND == "sqlite":
+        from gnomon_expenses.storage.sqlite import SqliteStorage
+        return SqliteStorage()
+    if STORAGE_BACKEND != "json":
+        raise ValueError(f"Unknown GNOMON_STORAGE backend {STORAGE_BACKEND!r} (expected json or sqlite)")
+    from gnomon_expenses.storage.local_json import LocalJsonStorage
+    return LocalJsonStorage()
+
+
+def ledger_identity() -> str | None:
+    """Backend, path and inode of the configured ledger file, or None while there is none.
+
+    Switching backend or recreating the ledger changes it, so state kept
+    alongside one ledger (the scanner's) is not trusted for another.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        paths = [SQLITE_PATH]
+    else:
+        paths = [LEDGER_PATH, LEDGER_PATH.with_name(LEDGER_PATH.name + ".journal")]
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size:
+            return f"{STORAGE_BACKEND}:{path.resolve()}:{st.st_ino}"
+    return None
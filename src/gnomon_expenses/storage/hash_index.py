@@ -0,0 +1,192 @@
+"""Persistent id -> (file_hash, month, position) index kept next to the JSON ledger.
+
+Dedup checks look hashes up here instead of parsing the whole ledger,
+mirror maintenance finds the month an expense used to be filed under, and
+queries answered from the monthly files put their matches back in ledger
+order by position. The
+index file records the size and mtime of the ledger snapshot it was built
+from and how far into the journal it has read. On load, a matching index only
+replays the journal tail; if the snapshot has changed since (or the file is
+missing or unreadable) the index is rebuilt from the ledger.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from gnomon_expenses.storage import journal
+
+_MAGIC = "gnomon-hashidx"
+_VERSION = "4"
+# Persist again once this many journal bytes have been replayed since the last write
+_PERSIST_EVERY = 256 * 1024
+
+
+def _stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class HashIndex:
+    """file_hash -> expense id (and id -> month) for one ledger, loaded once per process."""
+
+    def __init__(self, ledger_path: Path, journal_path: Path):
+        self.ledger_path = ledger_path
+        self.journal_path = journal_path
+        self.path = ledger_path.with_name(ledger_path.name + ".hashidx")
+        self._by_id: dict[str, tuple[str, str, int]] | None = None  # id -> (hash, month, position)
+        self._by_hash: dict[str, str] = {}
+        self._next = 0  # position of the next new id; positions only grow, with gaps after deletes
+        self._snap: tuple[int, int] | None = None  # snapshot (size, mtime_ns) we reflect
+        self._offset = 0  # journal bytes applied
+        self._persisted_offset = 0
+
+    def lookup(self, file_hash: str) -> str | None:
+        """Return the id of the record with this hash, if any."""
+        self._current()
+        return self._by_hash.get(file_hash)
+
+    def month_of(self, expense_id: str) -> str | None:
+        """'YYYY-MM' the expense is currently filed under, if it exists and has a date."""
+        self._current()
+        entry = (self._by_id or {}).get(expense_id)
+        return entry[1] or None if entry else None
+
+    def ids(self) -> list[str]:
+        """All expense ids in the ledger."""
+        self._current()
+        return list(self._by_id or {})
+
+    def in_ledger_order(self, records: list[dict]) -> list[dict]:
+        """`records` sorted by where their ids stand in the ledger."""
+        self._current()
+        by_id = self._by_id or {}
+        return sorted(records, key=lambda r: by_id.get(r.get("id", ""), ("", "", -1))[2])
+
+    def months(self) -> dict[str, set[str]]:
+        """Ids of the expenses filed under each 'YYYY-MM'."""
+        self._current()
+        by_month: dict[str, set[str]] = {}
+        for eid, (_, month, _) in (self._by_id or {}).items():
+            if month:
+                by_month.setdefault(month, set()).add(eid)
+        return by_month
+
+    def refresh(self, records: list[dict]) -> None:
+        """Rebuild from a snapshot just written (journal empty) and persist."""
+        self._set(records, _stamp(self.ledger_path), 0)
+
+    def _current(self) -> None:
+        snap = _stamp(self.ledger_path)
+        if self._by_id is None or snap != self._snap:
+            if not self._read(snap):
+                self._rebuild()
+                return
+        self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Apply journal entries written since we last looked."""
+        try:
+            size = self.journal_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size == self._offset:
+            return
+        if size < self._offset:  # journal was folded under us
+            self._rebuild()
+            return
+        with journal.locked(self.journal_path) as f:
+            entries, self._offset = journal.read(f, self._offset)
+        for entry in entries:
+            if entry.get("op") == "put":
+                self._put(entry["record"])
+            elif entry.get("op") == "del":
+                self._drop(entry.get("id", ""))
+        if self._snap is not None and self._offset - self._persisted_offset >= _PERSIST_EVERY:
+            self._write()
+
+    def _put(self, record: dict) -> None:
+        eid, h = record.get("id", ""), record.get("file_hash", "")
+        d = record.get("date")
+        month = d[:7] if isinstance(d, str) and len(d) >= 7 else ""
+        assert self._by_id is not None
+        old = self._by_id.get(eid)
+        if old is None:
+            position = self._next
+            self._next += 1
+        else:
+            # An update keeps its place, as journal.replay does
+            position = old[2]
+            if old[0] and self._by_hash.get(old[0]) == eid:
+                del self._by_hash[old[0]]
+        self._by_id[eid] = (h, month, position)
+        if h:
+            self._by_hash.setdefault(h, eid)
+
+    def _drop(self, eid: str) -> None:
+        assert self._by_id is not None
+        h = self._by_id.pop(eid, ("", "", 0))[0]
+        if h and self._by_hash.get(h) == eid:
+            del self._by_hash[h]
+
+    def _rebuild(self) -> None:
+        before = _stamp(self.ledger_path)
+        try:
+            with open(self.ledger_path) as f:
+                records = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            records = []
+        offset = 0
+        if self.journal_path.exists():
+            with journal.locked(self.journal_path) as f:
+                entries, offset = journal.read(f)
+            journal.replay(records, entries)
+        after = _stamp(self.ledger_path)
+        # Only persist if the snapshot didn't change under us while reading
+        self._set(records, after if before == after else None, offset)
+
+    def _set(self, records: list[dict], snap: tuple[int, int] | None, offset: int) -> None:
+        self._by_id, self._by_hash, self._next = {}, {}, 0
+        for r in records:
+            self._put(r)
+        self._snap, self._offset = snap, offset
+        if snap is not None:
+            self._write()
+
+    def _read(self, snap: tuple[int, int] | None) -> bool:
+        """Load the index file if it was built from the current snapshot."""
+        if snap is None:
+            return False
+        try:
+            with open(self.path) as f:
+                header = f.readline().split()
+                if header[:4] != [_MAGIC, _VERSION, str(snap[0]), str(snap[1])]:
+                    return False
+                offset = int(header[4])
+                rows = [line.split() for line in f if line.strip()]
+            by_id = {eid: ("" if h == "-" else h, "" if m == "-" else m, int(pos)) for eid, h, m, pos in rows}
+        except (FileNotFoundError, ValueError, IndexError):
+            return False
+        self._by_id, self._by_hash = by_id, {}
+        self._next = max((entry[2] for entry in by_id.values()), default=-1) + 1
+        for eid, (h, _, _) in by_id.items():
+            if h:
+                self._by_hash.setdefault(h, eid)
+        self._snap, self._offset, self._persisted_offset = snap, offset, offset
+        return True
+
+    def _write(self) -> None:
+        assert self._by_id is not None and self._snap is not None
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            f.write(f"{_MAGIC} {_VERSION} {self._snap[0]} {self._snap[1]} {self._offset}\n")
+            for eid in sorted(self._by_id):
+                h, month, position = self._by_id[eid]
+                f.write(f"{eid} {h or '-'} {month or '-'} {position}\n")
+        os.replace(tmp, self.path)
+        self._persisted_offset = self._offset
@@ -0,0 +1,86 @@
+"""Append-only NDJSON journal of ledger mutations.
+
+Each line is one entry: {"op": "put", "record": {...}} or {"op": "del", "id": "..."}.
+The ledger is the snapshot file with the journal replayed on top of it.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO
+
+
+@contextmanager
+def locked(path: Path, exclusive: bool = False) -> Iterator[BinaryIO]:
+    """Open (creating if needed) and flock the journal.
+
+    Writers and compaction take it exclusively; readers take it shared so they
+    never see a new snapshot together with the journal it was folded from.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def append(f: BinaryIO, entries: Iterable[dict]) -> int:
+    """Append entries to a locked journal. Returns the new end offset."""
+    f.write(b"".join(json.dumps(e, default=str).encode() + b"\n" for e in entries))
+    f.flush()
+    return f.tell()
+
+
+def read(f: BinaryIO, offset: int = 0) -> tuple[list[dict], int]:
+    """Read entries from `offset` on. Returns (entries, offset after the last full line).
+
+    A torn last line (crash mid-append) is left for later; undecodable lines are skipped.
+    """
+    f.seek(offset)
+    data = f.read()
+    end = data.rfind(b"\n") + 1
+    entries = []
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return entries, offset + end
+
+
+def replay(records: list[dict], entries: Iterable[dict]) -> None:
+    """Apply journal entries to snapshot records in place, keeping ledger order."""
+    index = {r.get("id"): i for i, r in enumerate(records)}
+    deleted = False
+    for entry in entries:
+        if entry.get("op") == "put":
+            record = entry["record"]
+            i = index.get(record.get("id"))
+            if i is None:
+                index[record.get("id")] = len(records)
+                records.append(record)
+            else:
+                records[i] = record
+        elif entry.get("op") == "del":
+            i = index.pop(entry.get("id"), None)
+            if i is not None:
+                records[i] = None  # type: ignore[call-overload]
+                deleted = True
+    if deleted:
+        records[:] = [r for r in records if r is not None]
+
+
+def puts(records: Iterable[dict]) -> list[dict]:
+    return [{"op": "put", "record": r} for r in records]
+
+
+def dels(ids: Iterable[str]) -> list[dict]:
+    return [{"op": "del", "id": eid} for eid in ids]
@@ -3,12 +3,22 @@
 import csv
 import fcntl
 import json
+import os
+import threading
+import time
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
-from gnomon_expenses.config import DATA_DIR, LEDGER_PATH
-from gnomon_expenses.models.expense import Expense
+from pydantic import ValidationError
+
+from gnomon_expenses.config import CSV_SYNC_INTERVAL, DATA_DIR, LEDGER_MODE, LEDGER_PATH
+from gnomon_expenses.models.expense import EXPENSE_LIST, Expense
+from gnomon_expenses.storage import journal
 from gnomon_expenses.storage.adapter import StorageAdapter
+from gnomon_expenses.storage.hash_index import HashIndex
+from gnomon_expenses.storage.query import Query
 
 CSV_FIELDS = [
     "id", "date", "vendor", "vendor_country", "description",
@@ -19,6 +29,11 @@ CSV_FIELDS = [
     "labels", "notes", "file_path", "status",
 ]
 
+# Journal mode folds the journal into a new snapshot once it outgrows this share
+# of the snapshot (and the floor below), so appends stay amortised O(record)
+JOURNAL_COMPACT_RATIO = 0.5
+JOURNAL_COMPACT_MIN_BYTES = 1_000_000
+
 
 def _read_json_locked(path: Path) -> list[dict]:
     if not path.exists():
@@ -34,6 +49,19 @@ def _read_json_locked(path: Path) -> list[dict]:
     return data
 
 
+def _read_bytes_locked(path: Path) -> bytes | None:
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            return f.read()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
 def _write_json_locked(path: Path, records: list[dict]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with open(path, "w") as f:
@@ -57,16 +85,53 @@ def _month_ledger_path(month: str) -> Path:
     return DATA_DIR / f"{month}.json"
 
 
-def _rebuild_monthly(records: list[dict]) -> None:
-    """Rebuild all monthly ledger files from the global records."""
+def _write_month(month: str, records: list[dict]) -> None:
+    """Write one month's JSON ledger and CSV mirror."""
+    _write_json_locked(_month_ledger_path(month), records)
+    _write_csv(records, DATA_DIR / f"{month}.csv")
+
+
+def _rebuild_monthly(records: list[dict], months: set[str] | None = None) -> None:
+    """Rebuild monthly JSON and CSV mirrors from the global records.
+
+    With `months`, only those months are rewritten (emptied if no records remain).
+    """
     by_month: dict[str, list[dict]] = defaultdict(list)
     for r in records:
         mk = _month_key(r)
-        if mk:
+        if mk and (months is None or mk in months):
             by_month[mk].append(r)
     # Write each month
-    for month, month_records in by_month.items():
-        _write_json_locked(_month_ledger_path(month), month_records)
+    for month in months if months is not None else by_month:
+        _write_month(month, by_month.get(month, []))
+
+
+def _patch_monthly(upserts: dict[str, dict], deleted: Iterable[str],
+                   old_months: dict[str, str | None]) -> None:
+    """Apply changes to the affected monthly files without reading the global ledger.
+
+    `old_months` maps each changed id to the month it was filed under before,
+    so an expense whose date moved is also removed from its old month.
+    """
+    puts: dict[str, dict[str, dict]] = defaultdict(dict)
+    removals: dict[str, set[str]] = defaultdict(set)
+    for eid, dump in upserts.items():
+        old, new = old_months.get(eid), _month_key(dump)
+        if old and old != new:
+            removals[old].add(eid)
+        if new:
+            puts[new][eid] = dump
+    for eid in deleted:
+        old = old_months.get(eid)
+        if old:
+            removals[old].add(eid)
+    for month in puts.keys() | removals.keys():
+        records = [
+            r for r in _read_json_locked(_month_ledger_path(month))
+            if r.get("id") not in removals[month]
+        ]
+        _upsert_records(records, puts[month])
+        _write_month(month, records)
 
 
 def _write_csv(records: list[dict], path: Path) -> None:
@@ -82,85 +147,303 @@ def _write_csv(records: list[dict], path: Path) -> None:
             writer.writerow(row)
 
 
-def _sync_csv(records: list[dict]) -> None:
-    """Rebuild data/ledger.csv and all monthly CSVs from records."""
-    # Global CSV
-    _write_csv(records, DATA_DIR / "ledger.csv")
-    # Monthly CSVs
-    by_month: dict[str, list[dict]] = defaultdict(list)
-    for r in records:
-        mk = _month_key(r)
+def _global_csv_path() -> Path:
+    return DATA_DIR / "ledger.csv"
+
+
+def write_mirrors(records: list[dict]) -> None:
+    """Rebuild every monthly JSON file and CSV mirror, and data/ledger.csv, from records."""
+    _rebuild_monthly(records)
+    _write_csv(records, _global_csv_path())
+
+
+def _upsert_records(records: list[dict], upserts: dict[str, dict]) -> set[str]:
+    """Apply upserts (id -> record) in place. Returns the months touched, old and new."""
+    index = {r.get("id"): i for i, r in enumerate(records)}
+    months: set[str] = set()
+    for eid, dump in upserts.items():
+        i = index.get(eid)
+        if i is None:
+            index[eid] = len(records)
+            records.append(dump)
+        else:
+            old_month = _month_key(records[i])
+            if old_month:
+                months.add(old_month)
+            records[i] = dump
+        mk = _month_key(dump)
         if mk:
-            by_month[mk].append(r)
-    for month, month_records in by_month.items():
-        _write_csv(month_records, DATA_DIR / f"{month}.csv")
-
-
-def _update_monthly_single(expense_dict: dict) -> None:
-    """Upsert a single expense into its monthly ledger."""
-    mk = _month_key(expense_dict)
-    if not mk:
-        return
-    path = _month_ledger_path(mk)
-    records = _read_json_locked(path)
-    eid = expense_dict.get("id")
-    for i, r in enumerate(records):
-        if r.get("id") == eid:
-            records[i] = expense_dict
-            _write_json_locked(path, records)
-            return
-    records.append(expense_dict)
-    _write_json_locked(path, records)
+            months.add(mk)
+    return months
 
 
 class LocalJsonStorage(StorageAdapter):
-    def __init__(self, path: Path | None = None):
+    def __init__(self, path: Path | None = None, journal_mode: bool | None = None):
         self.path = path or LEDGER_PATH
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.journal_mode = LEDGER_MODE == "journal" if journal_mode is None else journal_mode
+        # Upserts collected inside `batch()`, keyed by id; None outside a batch
+        self._pending: dict[str, dict] | None = None
+        self._hashes = HashIndex(self.path, self.journal_path)
+        self._compactor: threading.Thread | None = None
+        # Held while the ledger and its mirrors are changed together, so a
+        # background compaction never writes mirrors older than a write
+        # this process patched in meanwhile
+        self._mirror_lock = threading.RLock()
+        # ledger.csv left stale by GNOMON_CSV_SYNC_INTERVAL; only `flush()` writes it
+        # out, so one-shot commands leave it for `sync` or a later write
+        self._csv_dirty = False
+
+    def _read_ledger(self) -> list[dict]:
+        """Snapshot records with the journal replayed on top."""
+        if not self.journal_path.exists():
+            return _read_json_locked(self.path)
+        with journal.locked(self.journal_path) as f:
+            records = _read_json_locked(self.path)
+            entries, _ = journal.read(f)
+        journal.replay(records, entries)
+        return records
+
+    def _records(self) -> list[dict]:
+        """Ledger records as currently visible, including unflushed batch upserts."""
+        records = self._read_ledger()
+        if self._pending:
+            _upsert_records(records, self._pending)
+        return records
+
+    def _write(self, upserts: dict[str, dict]) -> None:
+        """Apply upserts: one journal append, or one snapshot rewrite, plus affected months."""
+        with self._mirror_lock:
+            if self.journal_mode:
+                old_months = {eid: self._hashes.month_of(eid) for eid in upserts}
+                self._append(journal.puts(upserts.values()))
+                _patch_monthly(upserts, (), old_months)
+                self._global_csv_changed()
+                return
+            records = self._read_ledger()
+            months = _upsert_records(records, upserts)
+            self._write_snapshot(records, months)
+
+    def _write_snapshot(self, records: list[dict], months: set[str] | None = None) -> None:
+        """Replace ledger.json, folding away any journal, and refresh index and mirrors."""
+        with self._mirror_lock:
+            if self.journal_path.exists():
+                with journal.locked(self.journal_path, exclusive=True) as f:
+                    _write_json_locked(self.path, records)
+                    f.truncate(0)
+            else:
+                _write_json_locked(self.path, records)
+            self._hashes.refresh(records)
+            _rebuild_monthly(records, months)
+            self._global_csv_changed(records)
+
+    def _global_csv_changed(self, records: list[dict] | None = None) -> None:
+        """Rewrite data/ledger.csv now, or mark it stale, per GNOMON_CSV_SYNC_INTERVAL.
+
+        A stale CSV is rewritten by `flush()`, which long-running processes
+        call when idle and on shutdown, by the first write after the interval,
+        or by compaction and `sync`; with a negative interval only the latter.
+        """
+        if CSV_SYNC_INTERVAL < 0:
+            return
+        try:
+            age = time.time() - _global_csv_path().stat().st_mtime
+        except FileNotFoundError:
+            age = float("inf")
+        if age >= CSV_SYNC_INTERVAL:
+            _write_csv(records if records is not None else self._read_ledger(), _global_csv_path())
+            self._csv_dirty = False
+        else:
+            self._csv_dirty = True
+
+    def flush(self) -> None:
+        """Rewrite data/ledger.csv if a write left it stale."""
+        with self._mirror_lock:
+            if self._csv_dirty:
+                self._csv_dirty = False
+                _write_csv(self._read_ledger(), _global_csv_path())
+
+    def _append(self, entries: list[dict]) -> None:
+        with journal.locked(self.journal_path, exclusive=True) as f:
+            size = journal.append(f, entries)
+        try:
+            snapshot_size = self.path.stat().st_size
+        except FileNotFoundError:
+            snapshot_size = 0
+        if size < max(JOURNAL_COMPACT_MIN_BYTES, snapshot_size * JOURNAL_COMPACT_RATIO):
+            return
+        if self._compactor is None or not self._compactor.is_alive():
+            # Not a daemon: interpreter exit waits for the snapshot to be written
+            self._compactor = threading.Thread(target=self.compact, name="ledger-compact")
+            self._compactor.start()
+
+    def compact(self) -> None:
+        """Fold the journal into a new ledger.json snapshot and rebuild the mirrors.
+
+        Safe to run from a background thread: it works on its own index
+        instance, readers block on the journal lock while the snapshot is
+        written, and this process's writers wait until the mirrors match it.
+        """
+        if not self.journal_path.exists():
+            return
+        with self._mirror_lock:
+            with journal.locked(self.journal_path, exclusive=True) as f:
+                records = _read_json_locked(self.path)
+                entries, _ = journal.read(f)
+                journal.replay(records, entries)
+                _write_json_locked(self.path, records)
+                f.truncate(0)
+            HashIndex(self.path, self.journal_path).refresh(records)
+            write_mirrors(records)
+            # ledger.csv now matches the ledger: nothing was written since
+            self._csv_dirty = False
 
     def load_all(self) -> list[Expense]:
-        return [Expense.model_validate(r) for r in _read_json_locked(self.path)]
+        """All records, validated in one pass over the raw ledger file when nothing is to be replayed."""
+        raw = self._snapshot_bytes() if not self._pending else None
+        if raw:
+            try:
+                return EXPENSE_LIST.validate_json(raw)
+            except ValidationError:
+                pass  # unreadable snapshot: the record path below decides
+        return EXPENSE_LIST.validate_python(self._records())
+
+    def _snapshot_bytes(self) -> bytes | None:
+        """ledger.json as read, if it is the whole ledger (no journal entries on top)."""
+        if not self.journal_path.exists():
+            return _read_bytes_locked(self.path)
+        with journal.locked(self.journal_path) as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return _read_bytes_locked(self.path)
+        return None
+
+    def records(self) -> list[dict]:
+        return self._records()
+
+    def _select(self, q: Query) -> list[dict]:
+        """Filter the raw records, so models are built for the matches only.
+
+        A query limited by date reads just the monthly files it covers, as
+        long as each holds exactly the ids the hash index files under it,
+        and puts the records back in ledger order.
+        """
+        records = None
+        if q.month or q.date_range:
+            by_month = self._hashes.months()
+            records = self._month_records({m: by_month[m] for m in q.months(by_month)})
+            if records is not None:
+                records = self._hashes.in_ledger_order(records)
+        if records is None:
+            records = self._read_ledger()
+        if self._pending:
+            _upsert_records(records, self._pending)
+        return q.apply(records)
+
+    def _month_records(self, months: dict[str, set[str]]) -> list[dict] | None:
+        """Records of these months from their monthly files; None if one is out of step."""
+        records: list[dict] = []
+        for month in sorted(months):
+            part = _read_json_locked(_month_ledger_path(month))
+            if {r.get("id") for r in part} != months[month]:
+                return None
+            records += part
+        return records
 
     def save(self, expense: Expense) -> None:
-        records = _read_json_locked(self.path)
         dump = json.loads(expense.model_dump_json())
-        # Upsert by id in global ledger
-        for i, r in enumerate(records):
-            if r.get("id") == expense.id:
-                records[i] = dump
-                _write_json_locked(self.path, records)
-                _update_monthly_single(dump)
-                _sync_csv(records)
-                return
-        records.append(dump)
-        _write_json_locked(self.path, records)
-        _update_monthly_single(dump)
-        _sync_csv(records)
+        if self._pending is not None:
+            self._pending[expense.id] = dump
+            return
+        self._write({expense.id: dump})
+
+    def save_many(self, expenses: Iterable[Expense]) -> None:
+        upserts = {e.id: json.loads(e.model_dump_json()) for e in expenses}
+        if self._pending is not None:
+            self._pending.update(upserts)
+        elif upserts:
+            self._write(upserts)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collect saves in memory and write them once on exit.
+
+        The batch is flushed even if the block raises, so work done before an
+        error or Ctrl+C is kept. Nested batches join the outermost one.
+        """
+        if self._pending is not None:
+            yield
+            return
+        self._pending = {}
+        try:
+            yield
+        finally:
+            pending, self._pending = self._pending, None
+            if pending:
+                self._write(pending)
 
     def save_all(self, expenses: list[Expense]) -> None:
-        records = [json.loads(e.model_dump_json()) for e in expenses]
-        _write_json_locked(self.path, records)
-        _rebuild_monthly(records)
-        _sync_csv(records)
+        if self._pending:
+            self._pending.clear()
+        self._write_snapshot([json.loads(e.model_dump_json()) for e in expenses])
 
     def find_by_id(self, expense_id: str) -> Expense | None:
-        for r in _read_json_locked(self.path):
+        for r in self._records():
             if r.get("id", "").startswith(expense_id):
                 return Expense.model_validate(r)
         return None
 
-    def find_by_hash(self, file_hash: str) -> Expense | None:
-        for r in _read_json_locked(self.path):
+    def _pending_by_hash(self, file_hash: str) -> dict | None:
+        for r in (self._pending or {}).values():
             if r.get("file_hash") == file_hash:
+                return r
+        return None
+
+    def id_for_hash(self, file_hash: str) -> str | None:
+        pending = self._pending_by_hash(file_hash)
+        if pending is not None:
+            return pending["id"]
+        eid = self._hashes.lookup(file_hash)
+        if eid is None or (self._pending and eid in self._pending):
+            return None
+        return eid
+
+    def find_by_hash(self, file_hash: str) -> Expense | None:
+        pending = self._pending_by_hash(file_hash)
+        if pending is not None:
+            return Expense.model_validate(pending)
+        eid = self.id_for_hash(file_hash)
+        if eid is None:
+            return None
+        for r in self._read_ledger():
+            if r.get("id") == eid:
                 return Expense.model_validate(r)
         return None
 
     def delete(self, expense_id: str) -> bool:
-        records = _read_json_locked(self.path)
-        new_records = [r for r in records if not r.get("id", "").startswith(expense_id)]
-        if len(new_records) < len(records):
-            _write_json_locked(self.path, new_records)
-            _rebuild_monthly(new_records)
-            _sync_csv(new_records)
-            return True
-        return False
+        dropped = False
+        if self._pending:
+            for eid in [eid for eid in self._pending if eid.startswith(expense_id)]:
+                del self._pending[eid]
+                dropped = True
+        if self.journal_mode:
+            with self._mirror_lock:
+                ids = [eid for eid in self._hashes.ids() if eid.startswith(expense_id)]
+                if ids:
+                    old_months = {eid: self._hashes.month_of(eid) for eid in ids}
+                    self._append(journal.dels(ids))
+                    _patch_monthly({}, ids, old_months)
+                    self._global_csv_changed()
+                    return True
+            return dropped
+        with self._mirror_lock:
+            records = self._read_ledger()
+            new_records = [r for r in records if not r.get("id", "").startswith(expense_id)]
+            if len(new_records) < len(records):
+                months = {
+                    mk for r in records
+                    if r.get("id", "").startswith(expense_id) and (mk := _month_key(r))
+                }
+                self._write_snapshot(new_records, months)
+                return True
+        return dropped
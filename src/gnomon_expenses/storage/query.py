@@ -0,0 +1,130 @@
+"""Filters for `StorageAdapter.query()`, evaluated on JSON records.
+
+Records are matched as the dicts they are stored as, so a backend only
+builds `Expense` models for the ones that match.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+
+# order_by values (prefix "-" for descending)
+ORDER_FIELDS = ("date", "vendor", "amount_gross", "processed_at", "id")
+
+
+def _decimal(value: object) -> Decimal:
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return Decimal("0")
+
+
+_SORT_KEYS = {
+    "date": lambda r: r.get("date") or "",
+    "vendor": lambda r: (r.get("vendor") or "").casefold(),
+    "amount_gross": lambda r: _decimal(r.get("amount_gross")),
+    "processed_at": lambda r: r.get("processed_at") or "",
+    "id": lambda r: r.get("id") or "",
+}
+
+
+@dataclass(frozen=True)
+class Query:
+    """Record filters; every one given must match. Dates compare as ISO strings."""
+
+    month: str | None = None  # "YYYY-MM"
+    date_range: tuple[date | None, date | None] | None = None  # inclusive, either end open
+    vendor: str | None = None  # case-insensitive substring
+    label: str | None = None
+    currency: str | None = None  # case-insensitive
+    status: str | None = None
+    account: int | None = None  # KMU category account
+    limit: int | None = None
+    order_by: str | None = None  # one of ORDER_FIELDS, "-" for descending; ties keep storage order
+
+    def __post_init__(self) -> None:
+        if self.date_range is not None and not any(self.date_range):
+            object.__setattr__(self, "date_range", None)
+        if isinstance(self.status, Enum):
+            object.__setattr__(self, "status", self.status.value)
+        if self.order_by and self.order_by.lstrip("-") not in ORDER_FIELDS:
+            raise ValueError(f"cannot order by {self.order_by!r} (one of {', '.join(ORDER_FIELDS)})")
+
+    @property
+    def bounds(self) -> tuple[str, str]:
+        """Inclusive ISO date bounds of `month` and `date_range` together ("" and "~" when open)."""
+        lo, hi = "", "~"
+        if self.month:
+            lo, hi = f"{self.month}-00", f"{self.month}-99"
+        if self.date_range:
+            start, end = self.date_range
+            if start:
+                lo = max(lo, start.isoformat())
+            if end:
+                hi = min(hi, end.isoformat())
+        return lo, hi
+
+    def months(self, known: Iterable[str]) -> set[str] | None:
+        """Which of the `known` months can hold matches; None if the query is not limited by date."""
+        if not self.month and not self.date_range:
+            return None
+        lo, hi = self.bounds
+        return {m for m in known if lo[:7] <= m <= hi[:7]}
+
+    def matches(self, r: dict) -> bool:
+        if self.month or self.date_range:
+            d = r.get("date")
+            lo, hi = self.bounds
+            if not d or not lo <= d <= hi:
+                return False
+        if self.vendor and self.vendor.casefold() not in (r.get("vendor") or "").casefold():
+            return False
+        if self.label and self.label not in (r.get("labels") or ()):
+            return False
+        if self.currency and (r.get("currency") or "").upper() != self.currency.upper():
+            return False
+        if self.status and r.get("status") != self.status:
+            return False
+        if self.account is not None and r.get("category_account") != self.account:
+            return False
+        return True
+
+    def apply(self, records: Iterable[dict]) -> list[dict]:
+        """The matching records, ordered and limited."""
+        found = [r for r in records if self.matches(r)]
+        if self.order_by:
+            field = self.order_by.lstrip("-")
+            found.sort(key=_SORT_KEYS[field], reverse=self.order_by.startswith("-"))
+        return found[:self.limit] if self.limit is not None else found
+
+    def params(self) -> dict[str, str]:
+        """As URL query parameters (see from_params)."""
+        params = {k: str(v) for k in ("month", "vendor", "label", "currency", "status", "account",
+                                      "limit", "order_by") if (v := getattr(self, k)) is not None}
+        if self.date_range:
+            start, end = self.date_range
+            if start:
+                params["from"] = start.isoformat()
+            if end:
+                params["to"] = end.isoformat()
+        return params
+
+    @classmethod
+    def from_params(cls, params: dict[str, str]) -> Query:
+        date_range = None
+        if "from" in params or "to" in params:
+            start, end = params.get("from"), params.get("to")
+            date_range = (date.fromisoformat(start) if start else None,
+                          date.fromisoformat(end) if end else None)
+        return cls(
+            month=params.get("month"), date_range=date_range,
+            vendor=params.get("vendor"), label=params.get("label"),
+            currency=params.get("currency"), status=params.get("status"),
+            account=int(params["account"]) if "account" in params else None,
+            limit=int(params["limit"]) if "limit" in params else None,
+            order_by=params.get("order_by"),
+        )
@@ -0,0 +1,59 @@
+"""Ledger access through a running `gnomon-expenses serve` daemon."""
+
+import json
+from collections.abc import Iterable
+from urllib.parse import quote, urlencode
+
+from gnomon_expenses.models.expense import EXPENSE_LIST, Expense
+from gnomon_expenses.server.client import request
+from gnomon_expenses.storage.adapter import StorageAdapter
+from gnomon_expenses.storage.query import Query
+
+
+def _dump(expense: Expense) -> dict:
+    return json.loads(expense.model_dump_json())
+
+
+class RemoteStorage(StorageAdapter):
+    """Reads come from the daemon's in-memory ledger; it writes them behind."""
+
+    def load_all(self) -> list[Expense]:
+        return EXPENSE_LIST.validate_python(self.records())
+
+    def records(self) -> list[dict]:
+        return request("GET", "/expenses")
+
+    def _select(self, q: Query) -> list[dict]:
+        params = q.params()
+        return request("GET", f"/expenses?{urlencode(params)}") if params else self.records()
+
+    def save(self, expense: Expense) -> None:
+        request("PUT", f"/expenses/{quote(expense.id)}", _dump(expense))
+
+    def save_many(self, expenses: Iterable[Expense]) -> None:
+        records = [_dump(e) for e in expenses]
+        if records:
+            request("POST", "/expenses", records)
+
+    def save_all(self, expenses: list[Expense]) -> None:
+        request("PUT", "/expenses", [_dump(e) for e in expenses])
+
+    def find_by_id(self, expense_id: str) -> Expense | None:
+        record = request("GET", f"/expenses/{quote(expense_id)}")
+        return Expense.model_validate(record) if record else None
+
+    def find_by_hash(self, file_hash: str) -> Expense | None:
+        records = request("GET", f"/expenses?hash={quote(file_hash)}")
+        return Expense.model_validate(records[0]) if records else None
+
+    def id_for_hash(self, file_hash: str) -> str | None:
+        return request("GET", f"/ids?hash={quote(file_hash)}")
+
+    def delete(self, expense_id: str) -> bool:
+        return bool(request("DELETE", f"/expenses/{quote(expense_id)}"))
+
+    def export_mirrors(self) -> None:
+        request("POST", "/sync", timeout=None)
+
+    def compact(self) -> None:
+        request("POST", "/compact", timeout=None)
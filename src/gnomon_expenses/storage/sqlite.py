@@ -0,0 +1,239 @@
+"""SQLite storage — indexed lookups, WAL mode for concurrent CLI and watcher access."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from gnomon_expenses.config import LEDGER_PATH, SQLITE_PATH
+from gnomon_expenses.models.expense import EXPENSE_LIST, Expense
+from gnomon_expenses.storage.adapter import StorageAdapter
+from gnomon_expenses.storage.query import Query
+
+# The full record lives in `data`; the other columns are copies kept for indexing.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    date TEXT,
+    vendor TEXT NOT NULL DEFAULT '',
+    currency TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    category_account INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_file_hash ON expenses(file_hash);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date);
+CREATE INDEX IF NOT EXISTS idx_expenses_vendor ON expenses(vendor COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_expenses_currency ON expenses(currency);
+CREATE INDEX IF NOT EXISTS idx_expenses_status ON expenses(status);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category_account);
+
+CREATE TABLE IF NOT EXISTS expense_labels (
+    expense_id TEXT NOT NULL REFERENCES expenses(id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    PRIMARY KEY (expense_id, label)
+);
+CREATE INDEX IF NOT EXISTS idx_expense_labels_label ON expense_labels(label);
+"""
+
+_UPSERT = """
+INSERT INTO expenses (id, file_hash, date, vendor, currency, status, category_account, data)
+VALUES (:id, :file_hash, :date, :vendor, :currency, :status, :category_account, :data)
+ON CONFLICT(id) DO UPDATE SET
+    file_hash = excluded.file_hash,
+    date = excluded.date,
+    vendor = excluded.vendor,
+    currency = excluded.currency,
+    status = excluded.status,
+    category_account = excluded.category_account,
+    data = excluded.data
+"""
+
+
+def _row(expense: Expense) -> dict:
+    return {
+        "id": expense.id,
+        "file_hash": expense.file_hash,
+        "date": expense.date.isoformat() if expense.date else None,
+        "vendor": expense.vendor,
+        "currency": expense.currency,
+        "status": expense.status.value,
+        "category_account": expense.category_account,
+        "data": expense.model_dump_json(),
+    }
+
+
+# ORDER BY terms for Query.order_by; rowid breaks ties in ledger order
+_ORDER = {
+    "date": "date",
+    "vendor": "vendor COLLATE NOCASE",
+    "amount_gross": "CAST(json_extract(data, '$.amount_gross') AS REAL)",
+    "processed_at": "json_extract(data, '$.processed_at')",
+    "id": "id",
+}
+
+
+def _where(q: Query) -> tuple[str, list]:
+    """WHERE clause (on the indexed columns) and parameters for a query."""
+    terms: list[str] = []
+    params: list = []
+    if q.month or q.date_range:
+        terms.append("date BETWEEN ? AND ?")
+        params += q.bounds
+    if q.vendor:
+        terms.append("instr(casefold(vendor), ?) > 0")
+        params.append(q.vendor.casefold())
+    if q.label:
+        terms.append("id IN (SELECT expense_id FROM expense_labels WHERE label = ?)")
+        params.append(q.label)
+    if q.currency:
+        terms.append("currency = ? COLLATE NOCASE")
+        params.append(q.currency)
+    if q.status:
+        terms.append("status = ?")
+        params.append(q.status)
+    if q.account is not None:
+        terms.append("category_account = ?")
+        params.append(q.account)
+    return (" WHERE " + " AND ".join(terms)) if terms else "", params
+
+
+def _prefix_range(prefix: str) -> tuple[str, str]:
+    """Bounds for an index range scan matching ids that start with `prefix`."""
+    return prefix, prefix + "\U0010ffff"
+
+
+class SqliteStorage(StorageAdapter):
+    def __init__(self, path: Path | None = None):
+        self.path = path or SQLITE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The watcher saves from several threads; one connection, serialized
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        # SQLite's own lower()/LIKE only fold ASCII; vendor filters match like str.casefold
+        self._conn.create_function("casefold", 1, lambda s: s.casefold() if s else s, deterministic=True)
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; nested use joins the outermost one."""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+
+    def _upsert(self, conn: sqlite3.Connection, expense: Expense) -> None:
+        conn.execute(_UPSERT, _row(expense))
+        conn.execute("DELETE FROM expense_labels WHERE expense_id = ?", (expense.id,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO expense_labels (expense_id, label) VALUES (?, ?)",
+            [(expense.id, lbl) for lbl in expense.labels],
+        )
+
+    def _data(self, sql: str, params: tuple = ()) -> list[str]:
+        with self._lock:
+            return [data for (data,) in self._conn.execute(sql, params).fetchall()]
+
+    def _fetch(self, sql: str, params: tuple = ()) -> list[Expense]:
+        # One JSON array, validated in a single call
+        return EXPENSE_LIST.validate_json("[" + ",".join(self._data(sql, params)) + "]")
+
+    def load_all(self) -> list[Expense]:
+        return self._fetch("SELECT data FROM expenses ORDER BY rowid")
+
+    def records(self) -> list[dict]:
+        return [json.loads(data) for data in self._data("SELECT data FROM expenses ORDER BY rowid")]
+
+    def _select(self, q: Query) -> list[dict]:
+        where, params = _where(q)
+        order = "rowid"
+        if q.order_by:
+            direction = " DESC" if q.order_by.startswith("-") else ""
+            order = f"{_ORDER[q.order_by.lstrip('-')]}{direction}, rowid"
+        sql = f"SELECT data FROM expenses{where} ORDER BY {order}"
+        if q.limit is not None:
+            sql += " LIMIT ?"
+            params.append(q.limit)
+        return [json.loads(data) for data in self._data(sql, tuple(params))]
+
+    def save(self, expense: Expense) -> None:
+        with self._tx() as conn:
+            self._upsert(conn, expense)
+
+    def save_many(self, expenses: Iterable[Expense]) -> None:
+        # One short transaction per call; batch() stays the default pass-through,
+        # so a long run never holds the write lock between its batches
+        with self._tx() as conn:
+            for expense in expenses:
+                self._upsert(conn, expense)
+
+    def save_all(self, expenses: list[Expense]) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM expenses")
+            for expense in expenses:
+                self._upsert(conn, expense)
+
+    def find_by_id(self, expense_id: str) -> Expense | None:
+        found = self._fetch(
+            "SELECT data FROM expenses WHERE id >= ? AND id < ? ORDER BY rowid LIMIT 1",
+            _prefix_range(expense_id),
+        )
+        return found[0] if found else None
+
+    def find_by_hash(self, file_hash: str) -> Expense | None:
+        found = self._fetch(
+            "SELECT data FROM expenses WHERE file_hash = ? ORDER BY rowid LIMIT 1", (file_hash,),
+        )
+        return found[0] if found else None
+
+    def id_for_hash(self, file_hash: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM expenses WHERE file_hash = ? ORDER BY rowid LIMIT 1", (file_hash,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, expense_id: str) -> bool:
+        with self._tx() as conn:
+            cur = conn.execute("DELETE FROM expenses WHERE id >= ? AND id < ?",
+                               _prefix_range(expense_id))
+        return cur.rowcount > 0
+
+    def compact(self) -> None:
+        """Checkpoint the WAL into the main database file and truncate it."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def migrate_from_json(self, ledger_path: Path | None = None) -> int:
+        """One-shot import of a JSON ledger (default data/ledger.json). Returns records imported.
+
+        Records are upserted by id, so running it twice is harmless.
+        """
+        path = ledger_path or LEDGER_PATH
+        if not path.exists():
+            return 0
+        with open(path) as f:
+            records = json.load(f)
+        self.save_many(Expense.model_validate(r) for r in records)
+        return len(records)
@@ -1,95 +1,362 @@
-"""watchdog-based folder watcher for auto-processing new PDFs."""
+"""watchdog-based folder watcher for auto-processing new PDFs.
+
+Events only update a table of files being written. One scheduler thread
+polls each of them until it is stable -- the same size and mtime on two
+checks, and a PDF trailer at the end -- backing off while it keeps growing,
+then submits it to the staged ingestion pipeline (see ingest.py). When the
+pipeline falls behind its queues fill up and the scheduler waits, while
+further events just coalesce in the table, so a burst of thousands of files
+runs at a steady rate with a fixed number of threads.
+
+On start, a catch-up scan queues the files that arrived or changed while
+nothing was watching. The observer is already running by then; its events
+are held until the scan is done, so nothing written meanwhile is missed
+and the backlog still goes first. A manifest of each file's
+(size, mtime, inode) and hash tells unchanged files apart without reading
+them again.
+"""
 
 from __future__ import annotations
 
+import heapq
+import os
+import threading
 import time
+from dataclasses import dataclass
 from pathlib import Path
-from threading import Timer
+from typing import Callable
 
-from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileMovedEvent
+from rich.console import Console
+from watchdog.events import (
+    FileClosedEvent,
+    FileCreatedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEventHandler,
+)
 from watchdog.observers import Observer
 
-from gnomon_expenses.config import SUPPORTED_EXTENSIONS
-from gnomon_expenses.extraction.pipeline import process_pdf
-from gnomon_expenses.models.expense import file_hash
-from gnomon_expenses.storage.local_json import LocalJsonStorage
+from gnomon_expenses.config import SUPPORTED_EXTENSIONS, WATCH_QUEUE, WATCH_WORKERS
+from gnomon_expenses.hash_cache import hash_cache
+from gnomon_expenses.ingest import Doc, Ingest
+from gnomon_expenses.manifest import Manifest
+from gnomon_expenses.scanner import scan
+from gnomon_expenses.storage.factory import get_storage
+
+# Stability polling: first check after an event, doubling while the file
+# still changes, up to POLL_MAX between checks (slow network uploads)
+POLL_FIRST = 0.25
+POLL_MAX = 5.0
+# A file without a PDF trailer is released once it has not changed for this long
+TRAILER_GRACE = 30.0
+# Re-queues of a document that failed while incomplete
+MAX_RETRIES = 3
+
+console = Console()
+
+
+def _signature(path: str) -> tuple[int, int] | None:
+    """(size, mtime_ns), or None if the file is gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _has_trailer(path: str) -> bool:
+    """Whether the file ends like a complete PDF (an %%EOF marker in its last KiB)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+
+@dataclass
+class _Pending:
+    due: float
+    interval: float
+    changed_at: float  # when the signature last changed
+    signature: tuple[int, int] | None = None
+    closed: bool = False  # the writer closed it (inotify close-write)
+    retries: int = 0
+
+
+class _Settler:
+    """Hand each path to `release` once the file has stopped changing."""
+
+    def __init__(self, release: Callable[[str], None]) -> None:
+        self._release = release
+        self._pending: dict[str, _Pending] = {}
+        self._heap: list[tuple[float, str]] = []  # may hold stale entries; _pending decides
+        self._retries: dict[str, int] = {}  # paths released after a retry, until they settle
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def _push(self, path: str, entry: _Pending) -> None:
+        heapq.heappush(self._heap, (entry.due, path))
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [(e.due, p) for p, e in self._pending.items()]
+            heapq.heapify(self._heap)
+        self._cond.notify()
+
+    def touch(self, path: str, closed: bool = False, delay: float = POLL_FIRST) -> None:
+        """An event for `path`: (re)start polling it from the shortest interval.
+
+        `delay` is when the first check is due (0 for files found already on disk).
+        """
+        signature = _signature(path)
+        with self._cond:
+            now = time.monotonic()
+            entry = self._pending.get(path)
+            if entry is None:
+                entry = self._pending[path] = _Pending(now, POLL_FIRST, now)
+            elif (entry.closed and not closed and signature and entry.signature
+                  and signature[0] == entry.signature[0]):
+                return  # metadata change after close-write (chmod, utime): nothing new written
+            if signature != entry.signature:
+                entry.changed_at = now
+            entry.signature = signature
+            entry.closed = closed
+            entry.interval = POLL_FIRST
+            entry.due = now if closed else now + delay
+            self._push(path, entry)
+
+    def retry(self, path: str) -> bool:
+        """Poll a document again after it failed while incomplete. False once out of retries."""
+        with self._cond:
+            retries = self._retries.pop(path, 0) + 1
+            if retries > MAX_RETRIES:
+                return False
+            now = time.monotonic()
+            interval = min(POLL_MAX, POLL_FIRST * 4 ** retries)
+            entry = self._pending[path] = _Pending(now + interval, interval, now, retries=retries)
+            self._push(path, entry)
+            return True
 
-# Debounce delay in seconds (PDF writes may not be atomic)
-DEBOUNCE_SECONDS = 2.0
+    def settled(self, path: str) -> None:
+        """A released document was handled for good; forget its retry count."""
+        with self._cond:
+            self._retries.pop(path, None)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _next_due(self) -> tuple[str, _Pending] | None:
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, path = self._heap[0]
+                entry = self._pending.get(path)
+                if entry is None or entry.due != due:
+                    heapq.heappop(self._heap)
+                    continue
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+                return path, entry
+            return None
+
+    def _check(self, path: str, entry: _Pending) -> bool | None:
+        """True to release, False to keep polling, None to forget the path."""
+        signature = _signature(path)
+        if signature is None:
+            return None
+        previous, entry.signature = entry.signature, signature
+        now = time.monotonic()
+        if signature != previous:
+            entry.changed_at = now
+        if entry.closed:
+            stable = previous is not None and signature[0] == previous[0]
+        else:
+            stable = signature == previous
+        stable = stable and signature[0] > 0
+        if not stable:
+            return False
+        return _has_trailer(path) or now - entry.changed_at >= TRAILER_GRACE
+
+    def run(self) -> None:
+        while (item := self._next_due()) is not None:
+            path, entry = item
+            due = entry.due
+            # stat() and the trailer read happen outside the lock
+            verdict = self._check(path, entry)
+            with self._cond:
+                if self._pending.get(path) is not entry or entry.due != due:
+                    continue  # touched again meanwhile; that schedule decides
+                if verdict is False:
+                    entry.closed = False
+                    entry.interval = min(POLL_MAX, entry.interval * 2)
+                    entry.due = time.monotonic() + entry.interval
+                    self._push(path, entry)
+                    continue
+                del self._pending[path]
+                if verdict is None:
+                    continue
+                if entry.retries:
+                    self._retries[path] = entry.retries
+            # Blocks while the pipeline is full: backpressure at its pace
+            self._release(path)
 
 
 class _PDFHandler(FileSystemEventHandler):
-    def __init__(self, base_dir: Path) -> None:
-        self._timers: dict[str, Timer] = {}
-        self._storage = LocalJsonStorage()
+    def __init__(self, base_dir: Path, workers: int = WATCH_WORKERS,
+                 queue_size: int = WATCH_QUEUE, manifest: Manifest | None = None) -> None:
+        self._storage = get_storage()
         self._base_dir = base_dir
+        self._manifest = manifest or Manifest(base_dir)
+        self._ingest = Ingest(self._storage, self._done, file_into=base_dir, extract_workers=workers,
+                              queue_size=queue_size, manifest=self._manifest, after_persist=self._saved)
+        self._signatures: dict[str, tuple[int, int] | None] = {}  # as released, to spot changes
+        self._signatures_lock = threading.Lock()
+        self._settler = _Settler(self._release)
+        # Events held during catch-up, path -> closed; None once it is done
+        self._held: dict[str, bool] | None = None
+        self._held_lock = threading.Lock()
+        self._scheduler = threading.Thread(target=self._settler.run, name="watch-settle", daemon=True)
 
-    def _process(self, path: str) -> None:
-        import shutil
+    def start(self) -> None:
+        self._ingest.start()
+        self._scheduler.start()
 
-        p = Path(path)
-        if not p.exists() or p.suffix.lower() not in SUPPORTED_EXTENSIONS:
-            return
+    def stop(self) -> None:
+        """Drop pending events, finish the documents already released and save them."""
+        self._settler.stop()
+        self._scheduler.join()
+        self._ingest.stop()
+        self._storage.flush()
+        self._saved()
+        for stage in self._ingest.stats():
+            if stage.items:
+                console.print(f"  [dim]{stage.summary()}[/dim]")
 
-        fhash = file_hash(p)
-        if self._storage.find_by_hash(fhash):
-            return
+    def catch_up(self, recursive: bool = False) -> int:
+        """Queue files that are new or changed since the last run, or not in the ledger yet.
+
+        Unchanged files are matched on the manifest by stat alone; new and
+        changed ones are hashed by the pipeline. Events that arrive meanwhile
+        are held, and passed on once the backlog is queued. Returns the
+        number queued.
+        """
+        with self._held_lock:
+            self._held = {}
+        try:
+            queued = self._queue_backlog(recursive)
+        finally:
+            with self._held_lock:
+                held, self._held = self._held, None
+            for path, closed in held.items():
+                self._settler.touch(path, closed)
+        self._saved()
+        return queued
+
+    def _queue_backlog(self, recursive: bool) -> int:
+        seen: set[str] = set()
+        queued = 0
+        for entry in scan(self._base_dir, recursive):
+            seen.add(entry.path)
+            try:
+                fhash = self._manifest.lookup(entry.path, entry.stat())
+            except OSError:
+                continue
+            if fhash is not None:
+                with self._ingest.storage_lock:
+                    if self._storage.id_for_hash(fhash):
+                        continue
+            self._settler.touch(entry.path, delay=0.0)
+            queued += 1
+        # Forget files removed meanwhile (only where this scan looked)
+        self._manifest.prune(seen, self._base_dir, recursive)
+        return queued
+
+    def tick(self) -> None:
+        """Called about once a second: write deferred mirrors while the pipeline is idle."""
+        if self._ingest.in_flight() == 0:
+            with self._ingest.storage_lock:
+                self._storage.flush()
 
-        from rich.console import Console
-        console = Console()
-
-        expense = process_pdf(p)
-        if expense:
-            # File into monthly folder
-            if expense.date:
-                folder = self._base_dir / expense.date.strftime("%y-%m")
-                folder.mkdir(exist_ok=True)
-                dest = folder / p.name
-                if dest != p:
-                    if dest.exists():
-                        stem, suffix = p.stem, p.suffix
-                        i = 1
-                        while dest.exists():
-                            dest = folder / f"{stem}_{i}{suffix}"
-                            i += 1
-                    shutil.move(str(p), str(dest))
-                    expense.file_path = str(dest)
-
-            self._storage.save(expense)
+    def _release(self, path: str) -> None:
+        with self._signatures_lock:
+            self._signatures[path] = _signature(path)
+        self._ingest.submit(path)
+
+    def _saved(self) -> None:
+        self._manifest.save()
+        hash_cache().save()
+
+    def _done(self, doc: Doc) -> None:
+        path = str(doc.path)
+        with self._signatures_lock:
+            before = self._signatures.pop(path, None)
+        if doc.status == "fail":
+            # Changed underneath us, or cut short: it was not finished after all
+            if (_signature(path) != before or not _has_trailer(path)) and self._settler.retry(path):
+                console.print(f"  [dim]wait[/dim]  {doc.path.name} (incomplete, will retry)")
+            else:
+                self._settler.settled(path)
+                console.print(f"  [red]fail[/red]  {doc.path.name} ({doc.error})")
+            return
+        self._settler.settled(path)
+        if doc.status == "ok":
+            expense = doc.expense
             filed = f" -> {expense.date.strftime('%y-%m')}/" if expense.date else ""
             console.print(
-                f"  [green]auto[/green]  {p.name} — "
+                f"  [green]auto[/green]  {doc.path.name} — "
                 f"{expense.vendor} {expense.currency} {expense.amount_gross}{filed}"
             )
-        else:
-            console.print(f"  [red]fail[/red]  {p.name} (could not extract)")
 
-    def _schedule(self, path: str) -> None:
-        # Cancel existing timer for this path (debounce)
-        if path in self._timers:
-            self._timers[path].cancel()
-        t = Timer(DEBOUNCE_SECONDS, self._process, args=[path])
-        t.daemon = True
-        t.start()
-        self._timers[path] = t
+    def _touch(self, path: str, closed: bool = False) -> None:
+        if Path(path).suffix.lower() not in SUPPORTED_EXTENSIONS:
+            return
+        with self._held_lock:
+            if self._held is not None:
+                self._held[path] = self._held.get(path, False) or closed
+                return
+        self._settler.touch(path, closed)
 
     def on_created(self, event: FileCreatedEvent) -> None:
         if not event.is_directory:
-            self._schedule(event.src_path)
+            self._touch(event.src_path)
+
+    def on_modified(self, event: FileModifiedEvent) -> None:
+        if not event.is_directory:
+            self._touch(event.src_path)
+
+    def on_closed(self, event: FileClosedEvent) -> None:
+        # Only reported where the platform can (inotify close-write on Linux)
+        if not event.is_directory:
+            self._touch(event.src_path, closed=True)
 
     def on_moved(self, event: FileMovedEvent) -> None:
         if not event.is_directory:
-            self._schedule(event.dest_path)
+            self._touch(event.dest_path)
 
 
 def start_watching(directory: str | Path, recursive: bool = False) -> None:
     """Start watching a directory for new PDFs. Blocks until Ctrl+C."""
+    handler = _PDFHandler(Path(directory).resolve())
+    handler.start()
     observer = Observer()
-    observer.schedule(_PDFHandler(Path(directory).resolve()), str(directory), recursive=recursive)
+    observer.schedule(handler, str(directory), recursive=recursive)
     observer.start()
     try:
+        # After the observer starts, so no file written during the scan goes unseen
+        queued = handler.catch_up(recursive)
+        if queued:
+            console.print(f"  [dim]catch-up[/dim]  {queued} file(s) new or changed since the last run")
         while True:
             time.sleep(1)
+            handler.tick()
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    handler.stop()
@@ -0,0 +1,41 @@
+"""Page-by-page parsing stops early only once every required field was really read."""
+
+from decimal import Decimal
+
+from gnomon_expenses.extraction import pipeline
+from gnomon_expenses.extraction.parsers.anthropic import AnthropicParser
+
+RECEIPT = (
+    "Anthropic, PBC\nsupport@anthropic.com\nInvoice number ABCD1234 0002\n"
+    "Receipt number 1234 5678\nDate paid February 8, 2026\n$216.20 paid on February 8, 2026\n"
+    "Max plan - 20x\nFeb 8 Mar 8, 2026"
+)
+TAX_PAGE = "Subtotal $200.00\nTax 8.1% on $200.00 $16.20\nTotal $216.20"
+
+
+def test_vat_default_does_not_stop_before_the_tax_line():
+    parts, result, parser = pipeline._parse_pages([RECEIPT, TAX_PAGE])
+    assert isinstance(parser, AnthropicParser)
+    assert parts == [RECEIPT, TAX_PAGE]
+    assert (result.vat_amount, result.vat_rate, result.amount_net) == (
+        Decimal("16.20"), Decimal("8.1"), Decimal("200.00"))
+
+
+def test_stops_once_every_required_field_is_read():
+    pages = iter([RECEIPT + "\n" + TAX_PAGE, "should not be read"])
+    parts, result, _ = pipeline._parse_pages(pages)
+    assert len(parts) == 1
+    assert next(pages) == "should not be read"
+    assert result.vat_amount == Decimal("16.20")
+
+
+def test_generic_document_is_not_reparsed_per_page(monkeypatch):
+    calls = []
+    real = pipeline._parse_text
+    monkeypatch.setattr(pipeline, "_parse_text", lambda text: calls.append(text) or real(text))
+    pages = [f"Page {i}\nTotal CHF 10.00" for i in range(40)]
+    parts, result, _ = pipeline._parse_pages(pages)
+    assert len(parts) == 40
+    assert result.amount_gross == Decimal("10.00")
+    # The generic parser can never stop early: the first page, then the whole text
+    assert len(calls) == 2
@@ -0,0 +1,79 @@
+"""Every backend answers `query()` like `Query.apply` over its records."""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from gnomon_expenses.models.expense import Expense, ExpenseStatus
+from gnomon_expenses.storage import local_json
+from gnomon_expenses.storage.local_json import LocalJsonStorage
+from gnomon_expenses.storage.query import Query
+from gnomon_expenses.storage.sqlite import SqliteStorage
+
+_ROWS = [
+    # vendor, date, gross, currency, account, labels, status -- not saved in date order
+    ("Infomaniak", date(2026, 2, 1), "7.60", "CHF", 6570, ["hosting"], ExpenseStatus.VERIFIED),
+    ("Hetzner Online", date(2025, 12, 1), "8.11", "EUR", 6570, ["hosting"], ExpenseStatus.PROCESSED),
+    ("Anthropic", date(2025, 12, 31), "216.20", "USD", 6570, ["ai", "api"], ExpenseStatus.VERIFIED),
+    ("hetzner cloud", date(2026, 1, 1), "4.51", "EUR", 6570, [], ExpenseStatus.NEEDS_REVIEW),
+    ("MÄRZ GmbH", date(2026, 1, 15), "1200.00", "CHF", 6500, ["office"], ExpenseStatus.PROCESSED),
+    ("Twilio", date(2026, 1, 31), "450.00", "USD", 6820, ["api"], ExpenseStatus.PROCESSED),
+    ("Unknown", None, "42.50", "CHF", None, ["office"], ExpenseStatus.NEEDS_REVIEW),
+    ("Namecheap", date(2026, 2, 28), "15.66", "USD", None, [], ExpenseStatus.NEEDS_REVIEW),
+]
+
+CASES = [
+    {},
+    {"month": "2026-01"},
+    {"month": "2025-12", "order_by": "-amount_gross"},
+    {"date_range": (date(2025, 12, 31), date(2026, 2, 1)), "order_by": "date"},
+    {"date_range": (date(2026, 1, 16), None)},
+    {"date_range": (date(2025, 12, 15), date(2026, 2, 10))},
+    {"date_range": (None, date(2026, 1, 1)), "order_by": "-date"},
+    {"vendor": "hetzner", "order_by": "vendor"},
+    {"vendor": "märz"},
+    {"label": "api", "order_by": "id"},
+    {"currency": "eur"},
+    {"status": ExpenseStatus.NEEDS_REVIEW, "order_by": "-vendor"},
+    {"account": 6570, "month": "2026-01"},
+    {"order_by": "amount_gross", "limit": 3},
+    {"currency": "usd", "order_by": "-date", "limit": 2},
+    {"month": "2027-01"},
+]
+
+
+def _expenses() -> list[Expense]:
+    return [
+        Expense(id=f"e{i:02}", file_path=f"/in/{i}.pdf", file_hash=f"h{i}", vendor=vendor, date=day,
+                amount_gross=Decimal(gross), currency=currency, category_account=account, labels=labels,
+                status=status, processed_at=datetime(2026, 3, 1, 12, i))
+        for i, (vendor, day, gross, currency, account, labels, status) in enumerate(_ROWS)
+    ]
+
+
+@pytest.fixture(params=["snapshot", "journal", "sqlite"])
+def storage(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(local_json, "DATA_DIR", tmp_path)  # monthly and CSV mirrors
+    if request.param == "sqlite":
+        backend = SqliteStorage(tmp_path / "ledger.db")
+    else:
+        backend = LocalJsonStorage(tmp_path / "ledger.json", journal_mode=request.param == "journal")
+    expenses = _expenses()
+    backend.save_many(expenses)
+    # An edit that moves a record to another month, and a delete
+    backend.save(expenses[3].model_copy(update={"date": date(2026, 2, 14)}))
+    backend.delete("e05")
+    yield backend
+    backend.flush()  # while DATA_DIR still points here
+
+
+@pytest.mark.parametrize("case", CASES, ids=[json.dumps(c, default=str) for c in CASES])
+def test_query_matches_apply(storage, case):
+    records = storage.records()
+    assert sorted(r["id"] for r in records) == ["e00", "e01", "e02", "e03", "e04", "e06", "e07"]
+    expected = Query(**case).apply(records)
+    got = storage.query(**case)
+    assert [e.id for e in got] == [r["id"] for r in expected]
+    assert all(isinstance(e, Expense) for e in got)